@@ -0,0 +1,281 @@
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: solo lo necesita el motor de análisis
+    np = None
+
+# Dimensiones codificadas como enteros densos; la fecha se guarda aparte como AAAAMMDD
+DIMENSIONES = ("pelicula", "genero", "sala", "hora", "metodo_pago")
+MEDIDAS = ("cantidad", "recaudacion")
+
+# Las dimensiones nulas se codifican con un valor centinela: NumPy no puede ordenar None junto a enteros
+SIN_VALOR = {
+    "genero": (0, "Sin género"),
+    "sala": (0, "Sin sala"),
+    "hora": ("", "Sin hora"),
+    "metodo_pago": (0, "Sin boleta")
+}
+
+CONSULTA_LIBRO = """
+    SELECT E.idEntrada, COALESCE(E.precio, 0), H.fecha, COALESCE(H.hora, ''), COALESCE(H.idSala, 0),
+           H.idPelicula, COALESCE(P.idGenero, 0), COALESCE(B.idMetodoPago, 0)
+    FROM Entrada E
+    JOIN Horario H ON E.idHorario = H.idHorario
+    JOIN Pelicula P ON H.idPelicula = P.idPelicula
+    LEFT JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
+    LEFT JOIN Boleta B ON BE.idBoleta = B.idBoleta
+    WHERE E.idEntrada > ?
+    ORDER BY E.idEntrada
+"""
+
+CONSULTAS_NOMBRES = {
+    "pelicula": "SELECT idPelicula, titulo FROM Pelicula",
+    "genero": "SELECT idGenero, nombreGenero FROM Genero",
+    "sala": "SELECT idSala, nombreSala FROM Sala",
+    "metodo_pago": "SELECT idMetodoPago, descripcion FROM MetodoPago"
+}
+
+
+def _numero(valor):
+    """Convertir una suma de NumPy en int si es entera, o en float redondeado a centavos"""
+    valor = round(float(valor), 2)
+    return int(valor) if valor.is_integer() else valor
+
+
+class SalesAnalytics:
+    """Libro de entradas en columnas NumPy para agrupar, sumar y filtrar de forma vectorizada"""
+    
+    def __init__(self, db_manager, tamano_lote=100000):
+        if np is None:
+            raise ImportError("El motor de análisis requiere NumPy (pip install numpy)")
+        self.db_manager = db_manager
+        self.tamano_lote = tamano_lote
+        self._lock = threading.RLock()
+        self._vaciar()
+    
+    def _vaciar(self):
+        self.filas = 0
+        self.ultima_entrada = 0
+        self.ultima_boleta = 0
+        self.tiempo_carga = 0.0
+        # Columnas con capacidad sobrante; solo las primeras self.filas posiciones son válidas
+        self._columnas = {
+            "id_entrada": np.empty(0, dtype=np.int64),
+            # Los precios pueden tener decimales (comprar_entrada usa 8.50 por defecto)
+            "precio": np.empty(0, dtype=np.float64),
+            "fecha": np.empty(0, dtype=np.int32)
+        }
+        for dimension in DIMENSIONES:
+            self._columnas[dimension] = np.empty(0, dtype=np.int32)
+        # dimensión -> {valor original: código} y la lista inversa código -> valor original
+        self._codigos = {dimension: {} for dimension in DIMENSIONES}
+        self._valores = {dimension: [] for dimension in DIMENSIONES}
+        # dimensión -> {valor original: nombre para mostrar}
+        self._nombres = {dimension: {} for dimension in CONSULTAS_NOMBRES}
+    
+    def _reservar(self, adicionales):
+        """Ampliar las columnas al doble cuando no caben las filas nuevas"""
+        necesarias = self.filas + adicionales
+        capacidad = len(self._columnas["id_entrada"])
+        if necesarias <= capacidad:
+            return
+        capacidad = max(necesarias, capacidad * 2, 1024)
+        for nombre, columna in self._columnas.items():
+            nueva = np.empty(capacidad, dtype=columna.dtype)
+            nueva[:self.filas] = columna[:self.filas]
+            self._columnas[nombre] = nueva
+    
+    def _codificar(self, dimension, valores):
+        """Traducir valores originales a códigos enteros estables entre cargas"""
+        unicos, inversa = np.unique(np.asarray(valores, dtype=object), return_inverse=True)
+        codigos = self._codigos[dimension]
+        conocidos = self._valores[dimension]
+        mapa = np.empty(len(unicos), dtype=np.int32)
+        for i, valor in enumerate(unicos):
+            codigo = codigos.get(valor)
+            if codigo is None:
+                codigo = codigos[valor] = len(conocidos)
+                conocidos.append(valor)
+            mapa[i] = codigo
+        return mapa[inversa]
+    
+    def _columna(self, nombre):
+        return self._columnas[nombre][:self.filas]
+    
+    def agregar_ventas(self, filas):
+        """Anexar ventas (idEntrada, precio, fecha, hora, idSala, idPelicula, idGenero, idMetodoPago)"""
+        if not filas:
+            return 0
+        ids, precios, fechas, horas, salas, peliculas, generos, metodos = zip(*filas)
+        
+        with self._lock:
+            if ids[0] <= self.ultima_entrada:
+                raise ValueError("Las ventas deben anexarse en orden creciente de idEntrada")
+            cantidad = len(ids)
+            self._reservar(cantidad)
+            tramo = slice(self.filas, self.filas + cantidad)
+            self._columnas["id_entrada"][tramo] = ids
+            self._columnas["precio"][tramo] = precios
+            self._columnas["fecha"][tramo] = [int(fecha.replace("-", "")) if fecha else 0 for fecha in fechas]
+            for dimension, valores in zip(DIMENSIONES, (peliculas, generos, salas, horas, metodos)):
+                self._columnas[dimension][tramo] = self._codificar(dimension, valores)
+            self.filas += cantidad
+            self.ultima_entrada = ids[-1]
+        return cantidad
+    
+    def _cargar_nombres(self, cursor):
+        for dimension, consulta in CONSULTAS_NOMBRES.items():
+            cursor.execute(consulta)
+            self._nombres[dimension] = dict(cursor.fetchall())
+    
+    def cargar(self):
+        """Leer todo el libro de entradas desde cero"""
+        with self._lock:
+            self._vaciar()
+            return self.actualizar()
+    
+    def actualizar(self):
+        """Anexar las ventas nuevas y el método de pago de las boletas emitidas desde la última carga"""
+        inicio = time.perf_counter()
+        with self._lock:
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                self._cargar_nombres(cursor)
+                
+                # Las entradas cargadas antes de su checkout quedaron sin método de pago
+                cursor.execute("""
+                    SELECT BE.idEntrada, COALESCE(B.idMetodoPago, 0)
+                    FROM Boleta B
+                    JOIN BoletaEntrada BE ON BE.idBoleta = B.idBoleta
+                    WHERE B.idBoleta > ? AND BE.idEntrada <= ?
+                """, (self.ultima_boleta, self.ultima_entrada))
+                pagos = cursor.fetchall()
+                cursor.execute("SELECT COALESCE(MAX(idBoleta), 0) FROM Boleta")
+                ultima_boleta = cursor.fetchone()[0]
+                
+                nuevas = 0
+                cursor.execute(CONSULTA_LIBRO, (self.ultima_entrada,))
+                while True:
+                    lote = cursor.fetchmany(self.tamano_lote)
+                    if not lote:
+                        break
+                    nuevas += self.agregar_ventas(lote)
+            
+            if pagos:
+                ids, metodos = (np.asarray(columna) for columna in zip(*pagos))
+                cargadas = self._columna("id_entrada")
+                posiciones = np.minimum(np.searchsorted(cargadas, ids), max(self.filas - 1, 0))
+                # Las entradas que el libro no incluye (sin horario o película) no tienen fila propia
+                presentes = cargadas[posiciones] == ids if self.filas else np.zeros(len(ids), dtype=bool)
+                if presentes.any():
+                    self._columnas["metodo_pago"][posiciones[presentes]] = self._codificar(
+                        "metodo_pago", metodos[presentes]
+                    )
+            self.ultima_boleta = ultima_boleta
+            self.tiempo_carga = time.perf_counter() - inicio
+        return nuevas
+    
+    def _mascara(self, filtros):
+        """Combinar los filtros en una máscara booleana sobre las filas cargadas"""
+        mascara = np.ones(self.filas, dtype=bool)
+        desde = filtros.pop("desde", None)
+        hasta = filtros.pop("hasta", None)
+        if desde:
+            mascara &= self._columna("fecha") >= int(desde.replace("-", ""))
+        if hasta:
+            mascara &= self._columna("fecha") <= int(hasta.replace("-", ""))
+        
+        for dimension, valores in filtros.items():
+            if dimension not in DIMENSIONES:
+                raise ValueError(f"Filtro desconocido: {dimension}")
+            if not isinstance(valores, (list, tuple, set)):
+                valores = [valores]
+            codigos = [self._codigos[dimension][v] for v in valores if v in self._codigos[dimension]]
+            mascara &= np.isin(self._columna(dimension), codigos)
+        return mascara
+    
+    def _etiqueta(self, dimension, valor):
+        if dimension == "fecha":
+            return f"{valor // 10000:04d}-{valor // 100 % 100:02d}-{valor % 100:02d}"
+        if dimension in SIN_VALOR and valor == SIN_VALOR[dimension][0]:
+            return SIN_VALOR[dimension][1]
+        return self._nombres.get(dimension, {}).get(valor, valor)
+    
+    def _acumular(self, dimensiones, medida, filtros):
+        """Sumar la medida por combinación de dimensiones; devuelve (totales, claves presentes, ejes)"""
+        if isinstance(dimensiones, str):
+            dimensiones = (dimensiones,)
+        if medida not in MEDIDAS:
+            raise ValueError(f"Medida desconocida: {medida}")
+        
+        mascara = self._mascara(filtros)
+        pesos = self._columna("precio")[mascara] if medida == "recaudacion" else None
+        
+        # Combinar los códigos de cada dimensión en un único índice (orden mixto)
+        claves = np.zeros(int(mascara.sum()), dtype=np.int64)
+        ejes = []
+        for dimension in dimensiones:
+            if dimension == "fecha":
+                valores, codigos = np.unique(self._columna("fecha")[mascara], return_inverse=True)
+                valores = valores.tolist()
+            else:
+                valores = list(self._valores[dimension])
+                codigos = self._columna(dimension)[mascara]
+            tamano = max(len(valores), 1)
+            claves = claves * tamano + codigos
+            ejes.append((dimension, valores, tamano))
+        
+        totales = np.bincount(claves, weights=pesos)
+        presentes = np.flatnonzero(np.bincount(claves))
+        return totales, presentes, ejes
+    
+    def _resultados(self, totales, claves, ejes):
+        """Traducir claves combinadas a etiquetas legibles"""
+        resultados = []
+        for clave in claves.tolist():
+            valor = _numero(totales[clave])
+            etiquetas = []
+            for dimension, valores, tamano in reversed(ejes):
+                clave, codigo = divmod(clave, tamano)
+                etiquetas.append(self._etiqueta(dimension, valores[codigo]))
+            etiquetas.reverse()
+            resultados.append((tuple(etiquetas) if len(ejes) > 1 else etiquetas[0], valor))
+        return resultados
+    
+    def agrupar(self, dimensiones, medida="recaudacion", **filtros):
+        """Agrupar por una o varias dimensiones; devuelve [(etiquetas, valor)] de mayor a menor"""
+        with self._lock:
+            totales, presentes, ejes = self._acumular(dimensiones, medida, filtros)
+        orden = presentes[np.argsort(-totales[presentes], kind="stable")]
+        return self._resultados(totales, orden, ejes)
+    
+    def top(self, dimensiones, k=10, medida="recaudacion", **filtros):
+        """Los k grupos con mayor cantidad o recaudación, sin ordenar el resto"""
+        with self._lock:
+            totales, presentes, ejes = self._acumular(dimensiones, medida, filtros)
+        if k < len(presentes):
+            presentes = presentes[np.argpartition(-totales[presentes], k - 1)[:k]]
+        orden = presentes[np.argsort(-totales[presentes], kind="stable")]
+        return self._resultados(totales, orden, ejes)
+    
+    def totales(self, **filtros):
+        """Cantidad de entradas y recaudación de las filas que cumplen los filtros"""
+        with self._lock:
+            mascara = self._mascara(filtros)
+            return {
+                'entradas': int(mascara.sum()),
+                'recaudacion': _numero(self._columna("precio")[mascara].sum())
+            }
+    
+    def estadisticas(self):
+        """Obtener el tamaño del libro cargado y el tiempo de la última carga"""
+        with self._lock:
+            return {
+                'filas': self.filas,
+                'ultima_entrada': self.ultima_entrada,
+                'memoria_bytes': sum(c[:self.filas].nbytes for c in self._columnas.values()),
+                'tiempo_carga': self.tiempo_carga,
+                'cardinalidades': {d: len(v) for d, v in self._valores.items()}
+            }
@@ -0,0 +1,850 @@
+"""
+Benchmarks del Sistema de Cine
+==============================
+
+Mediciones locales de rendimiento y comprobaciones de planes de consulta.
+Cada benchmark trabaja sobre una base de datos temporal, nunca sobre cine.db.
+
+Uso: python benchmarks.py [nombre ...]
+Sin argumentos se ejecutan todos los benchmarks registrados.
+"""
+
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from database_manager import DatabaseManager, PERFILES
+from servicios_del_cine import CinemaServices
+from importacion_csv import leer_filas
+from sesiones_usuario import SessionStore
+from servidor_api import CinemaHTTPServer
+
+
+def crear_base_temporal(directorio, nombre="bench.db", **opciones):
+    """Crear un DatabaseManager sobre un archivo temporal con los datos iniciales"""
+    return DatabaseManager(os.path.join(directorio, nombre), **opciones)
+
+
+def agregar_funciones(db_manager, cantidad, id_sala=1, id_pelicula=1):
+    """Insertar funciones de prueba en una sala y devolver sus IDs"""
+    with db_manager.conexion() as conn:
+        conn.executemany("""
+            INSERT INTO Horario (idPelicula, idSala, fecha, hora)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (id_pelicula, id_sala, f"2030-01-{1 + i // 24 % 28:02d}", f"{i % 24:02d}:{i // 672:02d}")
+            for i in range(cantidad)
+        ])
+        conn.commit()
+        cursor = conn.execute(
+            "SELECT idHorario FROM Horario WHERE idSala = ? AND fecha >= '2030-01-01'", (id_sala,)
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def poblar_datos_masivos(db_manager, salas=100, asientos_por_sala=100, funciones_por_sala=50,
+                         ocupacion=0.5, usuarios=20000):
+    """Cargar un volumen de datos grande y sintético para las mediciones"""
+    with db_manager.conexion() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO Usuario (nombreUsuario, clave, tipoUsuario) VALUES (?, ?, 'Cliente')",
+            ((f"cliente{i}", f"clave{i}") for i in range(usuarios))
+        )
+        cursor.execute("SELECT MIN(idUsuario), MAX(idUsuario) FROM Usuario")
+        primer_usuario, ultimo_usuario = cursor.fetchone()
+
+        cursor.execute("SELECT COALESCE(MAX(idSala), 0) FROM Sala")
+        primera_sala = cursor.fetchone()[0] + 1
+        ids_salas = range(primera_sala, primera_sala + salas)
+        cursor.executemany(
+            "INSERT INTO Sala (idSala, nombreSala, capacidad) VALUES (?, ?, ?)",
+            ((id_sala, f"Sala {id_sala}", asientos_por_sala) for id_sala in ids_salas)
+        )
+        cursor.executemany(
+            "INSERT INTO Asiento (idSala, codigo) VALUES (?, ?)",
+            ((id_sala, f"{chr(65 + n // 20)}{n % 20 + 1}")
+             for id_sala in ids_salas for n in range(asientos_por_sala))
+        )
+        cursor.executemany(
+            "INSERT INTO Horario (idPelicula, idSala, fecha, hora) VALUES (?, ?, ?, ?)",
+            ((1 + n % 2, id_sala, f"2030-{1 + n // 5 % 12:02d}-{1 + n // 60 % 28:02d}", f"{12 + n % 5 * 2}:00")
+             for id_sala in ids_salas for n in range(funciones_por_sala))
+        )
+        cursor.execute("""
+            INSERT INTO Entrada (idHorario, idUsuario, idAsiento, precio)
+            SELECT H.idHorario, ? + (H.idHorario * 7 + A.idAsiento) % ?, A.idAsiento, 8500
+            FROM Horario H
+            JOIN Asiento A ON A.idSala = H.idSala
+            WHERE H.idSala >= ? AND (A.idAsiento * 31 + H.idHorario) % 100 < ?
+        """, (primer_usuario, ultimo_usuario - primer_usuario + 1, primera_sala, int(ocupacion * 100)))
+        conn.commit()
+    return list(ids_salas)
+
+
+def medir(funcion, *args):
+    """Ejecutar una función y devolver (resultado, segundos)"""
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def benchmark_perfiles(compras=2000):
+    """Compras por segundo con cada perfil de escritura"""
+    print("\n=== PERFILES DE BASE DE DATOS: compras por segundo ===")
+    for perfil, pragmas in PERFILES.items():
+        if pragmas.get("query_only") == "ON":
+            print(f"{perfil:<16} (solo lectura, no admite compras)")
+            continue
+
+        with tempfile.TemporaryDirectory() as directorio:
+            db_manager = crear_base_temporal(directorio, perfil=perfil)
+            servicios = CinemaServices(db_manager)
+            asientos = [a[0] for a in servicios.obtener_asientos_sala(1)]
+            horarios = agregar_funciones(db_manager, compras // len(asientos) + 1)
+            pares = [(h, a) for h in horarios for a in asientos][:compras]
+
+            def comprar():
+                for id_horario, id_asiento in pares:
+                    servicios.comprar_entrada(id_horario, 1, id_asiento, 8500)
+
+            _, segundos = medir(comprar)
+            db_manager.pool.cerrar()
+
+        print(f"{perfil:<16} {compras / segundos:>10.0f} compras/s  ({segundos:.2f} s)")
+
+
+def benchmark_disponibilidad(consultas=2000):
+    """Listado de asientos libres: consulta anti-join frente al mapa de bits"""
+    print("\n=== DISPONIBILIDAD DE ASIENTOS: anti-join SQL frente a mapa de bits ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager)
+        poblar_datos_masivos(db_manager, salas=20, asientos_por_sala=500, funciones_por_sala=20)
+        with db_manager.conexion() as conn:
+            horarios = [fila[0] for fila in conn.execute("SELECT idHorario FROM Horario")]
+
+            def anti_join():
+                for i in range(consultas):
+                    id_horario = horarios[i % len(horarios)]
+                    conn.execute("""
+                        SELECT a.idAsiento, a.codigo, s.nombreSala
+                        FROM Asiento a
+                        JOIN Sala s ON a.idSala = s.idSala
+                        WHERE a.idSala = (SELECT idSala FROM Horario WHERE idHorario = ?)
+                        AND a.idAsiento NOT IN (SELECT idAsiento FROM Entrada WHERE idHorario = ?)
+                        ORDER BY a.codigo
+                    """, (id_horario, id_horario)).fetchall()
+
+            def mapa_de_bits():
+                for i in range(consultas):
+                    servicios.obtener_asientos_compra(horarios[i % len(horarios)])
+
+            _, segundos_sql = medir(anti_join)
+            _, segundos_mapa = medir(mapa_de_bits)
+            inconsistentes = [
+                h for h in horarios if not servicios.disponibilidad.verificar_consistencia(h)['consistente']
+            ]
+        db_manager.pool.cerrar()
+
+    print(f"anti-join SQL    {consultas / segundos_sql:>10.0f} listados/s")
+    print(f"mapa de bits     {consultas / segundos_mapa:>10.0f} listados/s")
+    print(f"funciones inconsistentes: {len(inconsistentes)}")
+
+
+def benchmark_compra_grupal(grupos=300, asientos_por_grupo=8):
+    """Compra de grupos: una entrada por llamada frente a comprar_entradas"""
+    print(f"\n=== COMPRA GRUPAL: {grupos} grupos de {asientos_por_grupo} asientos ===")
+    for modo in ("por asiento", "en lote"):
+        with tempfile.TemporaryDirectory() as directorio:
+            db_manager = crear_base_temporal(directorio)
+            servicios = CinemaServices(db_manager)
+            poblar_datos_masivos(db_manager, salas=1, asientos_por_sala=asientos_por_grupo,
+                                 funciones_por_sala=grupos, ocupacion=0, usuarios=10)
+            with db_manager.conexion() as conn:
+                funciones = conn.execute("""
+                    SELECT H.idHorario, GROUP_CONCAT(A.idAsiento)
+                    FROM Horario H
+                    JOIN Asiento A ON A.idSala = H.idSala
+                    WHERE H.idSala > 2
+                    GROUP BY H.idHorario
+                """).fetchall()
+
+            def comprar():
+                for id_horario, asientos in funciones:
+                    ids = [int(a) for a in asientos.split(",")]
+                    if modo == "en lote":
+                        servicios.comprar_entradas(id_horario, 1, ids, 8500)
+                    else:
+                        for id_asiento in ids:
+                            servicios.comprar_entrada(id_horario, 1, id_asiento, 8500)
+
+            _, segundos = medir(comprar)
+            db_manager.pool.cerrar()
+
+        print(f"{modo:<12} {len(funciones) / segundos:>10.0f} grupos/s  ({segundos:.2f} s)")
+
+
+def benchmark_async(solicitudes=4000, clientes=(1, 8, 64)):
+    """Solicitudes por segundo de la fachada asyncio con distintos clientes concurrentes"""
+    import asyncio
+    from servicios_async import AsyncCinemaServices
+
+    print(f"\n=== FACHADA ASYNCIO: {solicitudes} solicitudes ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        poblar_datos_masivos(db_manager, salas=10, asientos_por_sala=100, funciones_por_sala=20,
+                             usuarios=1000)
+        with db_manager.conexion() as conn:
+            horarios = [fila[0] for fila in conn.execute("SELECT idHorario FROM Horario")]
+
+        for cantidad in clientes:
+            servicios = AsyncCinemaServices(CinemaServices(db_manager), hilos=8)
+
+            async def cliente(numero):
+                for i in range(numero, solicitudes, cantidad):
+                    if i % 2:
+                        await servicios.obtener_asientos_compra(horarios[i % len(horarios)])
+                    else:
+                        await servicios.obtener_info_horario(horarios[i % len(horarios)])
+
+            async def simular():
+                await asyncio.gather(*(cliente(n) for n in range(cantidad)))
+
+            _, segundos = medir(asyncio.run, simular())
+            servicios.cerrar()
+            print(f"{cantidad:>3} clientes  {solicitudes / segundos:>10.0f} solicitudes/s")
+
+        db_manager.pool.cerrar()
+
+
+def benchmark_exportacion(salas=40, funciones_por_sala=100):
+    """Exportación en streaming del libro de entradas, con y sin gzip"""
+    import tracemalloc
+    from exportacion_csv import exportar_filas
+
+    print("\n=== EXPORTACIÓN CSV EN STREAMING ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager)
+        poblar_datos_masivos(db_manager, salas=salas, asientos_por_sala=100,
+                             funciones_por_sala=funciones_por_sala, usuarios=5000)
+
+        for comprimir in (False, True):
+            tracemalloc.start()
+            resultado = exportar_filas(
+                os.path.join(directorio, "entradas.csv"),
+                ["Entrada", "Boleta", "Fecha", "Hora", "Película", "Sala", "Asiento", "Cliente", "Precio"],
+                servicios.iterar_libro_entradas(), comprimir
+            )
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            tamano = os.path.getsize(resultado['archivo']) / 1024 / 1024
+            print(f"{'gzip' if comprimir else 'csv':<5} {resultado['filas']:>8} filas  "
+                  f"{resultado['filas_por_segundo']:>9.0f} filas/s  {tamano:6.1f} MB  "
+                  f"memoria pico {pico / 1024:.0f} KB")
+        db_manager.pool.cerrar()
+
+
+def benchmark_analitica(salas=100, funciones_por_sala=400, repeticiones=5):
+    """Consultas ad hoc sobre el libro de entradas: SQL con joins frente a columnas NumPy"""
+    from analitica import SalesAnalytics
+
+    print("\n=== ANALÍTICA DE VENTAS: SQL frente a columnas NumPy ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio, perfil="batch-load")
+        poblar_datos_masivos(db_manager, salas=salas, asientos_por_sala=100,
+                             funciones_por_sala=funciones_por_sala, usuarios=5000)
+        analitica = SalesAnalytics(db_manager)
+        filas, segundos_carga = medir(analitica.cargar)
+        print(f"libro cargado: {filas} entradas en {segundos_carga:.2f} s "
+              f"({analitica.estadisticas()['memoria_bytes'] / 1024 / 1024:.0f} MB)")
+
+        joins = """
+            FROM Entrada E
+            JOIN Horario H ON E.idHorario = H.idHorario
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+        """
+        consultas = [
+            ("recaudación por película",
+             f"SELECT P.titulo, SUM(E.precio) {joins} GROUP BY P.idPelicula ORDER BY 2 DESC", (),
+             lambda: analitica.agrupar("pelicula")),
+            ("entradas por sala y hora en un trimestre",
+             f"""SELECT H.idSala, H.hora, COUNT(*) {joins}
+                 WHERE H.fecha BETWEEN '2030-01-01' AND '2030-03-31'
+                 GROUP BY H.idSala, H.hora ORDER BY 3 DESC""", (),
+             lambda: analitica.agrupar(("sala", "hora"), "cantidad", desde="2030-01-01", hasta="2030-03-31")),
+            ("top 5 días de una película a las 20:00",
+             f"""SELECT H.fecha, SUM(E.precio) {joins}
+                 WHERE P.idPelicula = 1 AND H.hora = '20:00'
+                 GROUP BY H.fecha ORDER BY 2 DESC LIMIT 5""", (),
+             lambda: analitica.top("fecha", 5, pelicula=1, hora="20:00")),
+            ("totales por método de pago",
+             f"""SELECT COALESCE(B.idMetodoPago, 0), COUNT(*), SUM(E.precio) {joins}
+                 LEFT JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
+                 LEFT JOIN Boleta B ON BE.idBoleta = B.idBoleta
+                 GROUP BY 1""", (),
+             lambda: analitica.agrupar("metodo_pago"))
+        ]
+
+        with db_manager.conexion() as conn:
+            for nombre, consulta, parametros, vectorizada in consultas:
+                _, segundos_sql = medir(lambda: [conn.execute(consulta, parametros).fetchall()
+                                                 for _ in range(repeticiones)])
+                _, segundos_numpy = medir(lambda: [vectorizada() for _ in range(repeticiones)])
+                print(f"{nombre:<42} SQL {segundos_sql / repeticiones * 1000:>8.1f} ms  "
+                      f"NumPy {segundos_numpy / repeticiones * 1000:>7.1f} ms  "
+                      f"x{segundos_sql / segundos_numpy:.0f}")
+        db_manager.pool.cerrar()
+
+
+def benchmark_reportes(salas=100, funciones_por_sala=200, repeticiones=3):
+    """Los cuatro reportes completos: una consulta por reporte frente a una sola pasada"""
+    from servicios_del_cine import REPORTES_ESTADISTICAS
+
+    print("\n=== REPORTES DE ESTADÍSTICAS: cuatro consultas frente a una pasada ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio, perfil="batch-load")
+        servicios = CinemaServices(db_manager)
+        poblar_datos_masivos(db_manager, salas=salas, asientos_por_sala=100,
+                             funciones_por_sala=funciones_por_sala, usuarios=5000)
+
+        with db_manager.conexion() as conn:
+            def cuatro_consultas():
+                return {
+                    reporte: conn.execute(consulta_completa).fetchall()
+                    for reporte, (_, consulta_completa) in REPORTES_ESTADISTICAS.items()
+                }
+
+            for _ in range(repeticiones):
+                base, segundos_base = medir(cuatro_consultas)
+                una_pasada, segundos_pasada = medir(servicios.calcular_estadisticas)
+            entradas = conn.execute("SELECT COUNT(*) FROM Entrada").fetchone()[0]
+        coinciden = all(set(base[r]) == set(una_pasada[r]) for r in REPORTES_ESTADISTICAS)
+        db_manager.pool.cerrar()
+
+    print(f"{entradas} entradas")
+    print(f"cuatro consultas  {segundos_base * 1000:>9.1f} ms")
+    print(f"una pasada        {segundos_pasada * 1000:>9.1f} ms  (x{segundos_base / segundos_pasada:.1f})")
+    print(f"resultados idénticos: {'sí' if coinciden else 'NO'}")
+
+
+def benchmark_importacion(salas=100, dias=60, funciones_por_dia=6, individuales=1000):
+    """Importación masiva de horarios desde CSV frente a agregar_horario uno por uno"""
+    import csv
+    from datetime import date, timedelta
+
+    print("\n=== IMPORTACIÓN DE HORARIOS: lote frente a agregar_horario ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager, limpieza_salas=15)
+        ids_salas = poblar_datos_masivos(db_manager, salas=salas, asientos_por_sala=10,
+                                         funciones_por_sala=0, usuarios=0)
+
+        # Dos meses de programación para todas las salas (funciones cada 2,5 horas),
+        # más algunas filas que se solapan con otras del archivo y una inválida
+        nombre_archivo = os.path.join(directorio, "horarios.csv")
+        inicio = date(2031, 1, 1)
+        with open(nombre_archivo, "w", newline="", encoding="utf-8") as archivo:
+            escritor = csv.writer(archivo)
+            escritor.writerow(["idPelicula", "idSala", "fecha", "hora"])
+            for id_sala in ids_salas:
+                for dia in range(dias):
+                    fecha = (inicio + timedelta(days=dia)).isoformat()
+                    for n in range(funciones_por_dia):
+                        minutos = 10 * 60 + n * 150
+                        escritor.writerow([1 + n % 2, id_sala, fecha, f"{minutos // 60:02d}:{minutos % 60:02d}"])
+                escritor.writerow([1, id_sala, inicio.isoformat(), "11:00"])
+            escritor.writerow([1, ids_salas[0], "2031-13-45", "25:00"])
+
+        (resultados, mensaje), segundos_lote = medir(servicios.importar_horarios, leer_filas(nombre_archivo))
+        importados = sum(1 for r in resultados if r['id_horario'])
+
+        def uno_por_uno():
+            for n in range(individuales):
+                fecha = (inicio + timedelta(days=400 + n // len(ids_salas))).isoformat()
+                servicios.agregar_horario(1, ids_salas[n % len(ids_salas)], fecha, "12:00")
+
+        _, segundos_individual = medir(uno_por_uno)
+        db_manager.pool.cerrar()
+
+    print(mensaje)
+    print(f"lote          {len(resultados):>7} filas ({importados} importadas) en {segundos_lote:.2f} s  "
+          f"{len(resultados) / segundos_lote:>9.0f} filas/s")
+    print(f"uno por uno   {individuales:>7} filas en {segundos_individual:.2f} s  "
+          f"{individuales / segundos_individual:>9.0f} filas/s")
+
+
+def benchmark_programacion(salas=50, semanas=4, limpieza=20):
+    """Programación automática de todas las salas durante varias semanas"""
+    print("\n=== PROGRAMACIÓN AUTOMÁTICA DE SALAS ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager, limpieza_salas=limpieza)
+        poblar_datos_masivos(db_manager, salas=salas, asientos_por_sala=10, funciones_por_sala=0, usuarios=0)
+
+        (resultados, mensaje), segundos = medir(servicios.generar_programacion, "2031-03-03", semanas * 7)
+
+        # Comprobar con SQL que ninguna función se solapa con otra de su sala (incluida la limpieza)
+        with db_manager.conexion() as conn:
+            solapadas = conn.execute("""
+                WITH F AS (
+                    SELECT H.idHorario, H.idSala,
+                           (julianday(H.fecha || ' ' || H.hora) - julianday('2000-01-01')) * 1440 AS inicio,
+                           P.duracion
+                    FROM Horario H JOIN Pelicula P ON H.idPelicula = P.idPelicula
+                )
+                SELECT COUNT(*) FROM F A JOIN F B
+                ON A.idSala = B.idSala AND A.idHorario < B.idHorario
+                AND A.inicio < B.inicio + B.duracion + ? - 0.001
+                AND B.inicio < A.inicio + A.duracion + ? - 0.001
+            """, (limpieza, limpieza)).fetchone()[0]
+        db_manager.pool.cerrar()
+
+    print(mensaje)
+    print(f"{salas} salas x {semanas * 7} días en {segundos * 1000:.0f} ms "
+          f"({len(resultados) / segundos:.0f} funciones/s)")
+    print(f"funciones solapadas: {solapadas}")
+
+
+def benchmark_asientos(filas=20, columnas=25):
+    """Distribución de una sala grande: grilla en lote frente a un INSERT y commit por asiento"""
+    print("\n=== GENERACIÓN DE ASIENTOS: grilla en lote frente a uno por uno ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager)
+        ids_salas = poblar_datos_masivos(db_manager, salas=2, asientos_por_sala=0, funciones_por_sala=0, usuarios=0)
+
+        def uno_por_uno():
+            with db_manager.conexion() as conn:
+                for n in range(filas * columnas):
+                    conn.execute("INSERT INTO Asiento (idSala, codigo) VALUES (?, ?)",
+                                 (ids_salas[0], f"{chr(65 + n // columnas)}{n % columnas + 1}"))
+                    conn.commit()
+
+        _, segundos_individual = medir(uno_por_uno)
+        (creados, mensaje), segundos_lote = medir(
+            servicios.generar_distribucion_asientos, ids_salas[1], filas, columnas
+        )
+        capacidad = dict((sala[0], sala[2]) for sala in servicios.obtener_salas())[ids_salas[1]]
+        db_manager.pool.cerrar()
+
+    print(f"uno por uno   {filas * columnas} asientos en {segundos_individual * 1000:>7.1f} ms")
+    print(f"grilla        {creados} asientos en {segundos_lote * 1000:>7.1f} ms  (capacidad de la sala: {capacidad})")
+
+
+def benchmark_historial(salas=100, funciones_por_sala=200, usuarios=2000, paginas=200):
+    """Historial de boletas de un cliente frecuente: camino BoletaEntrada -> Entrada frente a Boleta.idUsuario"""
+    print("\n=== HISTORIAL DE BOLETAS POR CLIENTE ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio, perfil="batch-load")
+        servicios = CinemaServices(db_manager)
+        poblar_datos_masivos(db_manager, salas=salas, asientos_por_sala=100,
+                             funciones_por_sala=funciones_por_sala, usuarios=usuarios)
+        with db_manager.conexion() as conn:
+            # Una boleta por cliente y función, con todas sus entradas
+            conn.execute("""
+                INSERT INTO Boleta (idMetodoPago, total, idEntrada)
+                SELECT 1, SUM(precio), MIN(idEntrada) FROM Entrada GROUP BY idHorario, idUsuario
+            """)
+            conn.execute("""
+                INSERT INTO BoletaEntrada (idBoleta, idEntrada)
+                SELECT B.idBoleta, E.idEntrada
+                FROM Boleta B
+                JOIN Entrada P ON P.idEntrada = B.idEntrada
+                JOIN Entrada E ON E.idHorario = P.idHorario AND E.idUsuario = P.idUsuario
+            """)
+            conn.commit()
+            entradas, boletas = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM Entrada), (SELECT COUNT(*) FROM Boleta)"
+            ).fetchone()
+            id_usuario, cantidad = conn.execute("""
+                SELECT idUsuario, COUNT(*) FROM Boleta GROUP BY idUsuario ORDER BY 2 DESC LIMIT 1
+            """).fetchone()
+
+            def por_entradas():
+                return conn.execute("""
+                    SELECT DISTINCT B.idBoleta, B.fechaCompra, B.total
+                    FROM Entrada E
+                    JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
+                    JOIN Boleta B ON B.idBoleta = BE.idBoleta
+                    WHERE E.idUsuario = ?
+                    ORDER BY B.idBoleta DESC
+                    LIMIT 10
+                """, (id_usuario,)).fetchall()
+
+            _, segundos_camino = medir(por_entradas)
+            _, segundos_indice = medir(lambda: [next(servicios.iterar_boletas_usuario(id_usuario))
+                                                for _ in range(paginas)])
+            todas, segundos_todas = medir(lambda: sum(len(p) for p in servicios.iterar_boletas_usuario(id_usuario)))
+        db_manager.pool.cerrar()
+
+    print(f"{entradas} entradas, {boletas} boletas; el cliente {id_usuario} tiene {cantidad} boletas")
+    print(f"primera página por BoletaEntrada -> Entrada   {segundos_camino * 1000:>8.2f} ms")
+    print(f"primera página por Boleta.idUsuario           {segundos_indice / paginas * 1000:>8.2f} ms")
+    print(f"historial completo ({todas} boletas)          {segundos_todas * 1000:>8.2f} ms")
+
+
+def benchmark_boletas(boletas=2000, repeticiones=7):
+    """Lectura de boletas: dos consultas con subconsulta correlacionada, una consulta y caché LRU"""
+    print("\n=== LECTURA DE BOLETAS ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager, max_boletas=boletas)
+        poblar_datos_masivos(db_manager, salas=20, asientos_por_sala=100, funciones_por_sala=20, usuarios=500)
+        with db_manager.conexion() as conn:
+            entradas = [fila[0] for fila in conn.execute("SELECT idEntrada FROM Entrada LIMIT ?", (boletas * 4,))]
+        ids = [servicios.checkout(entradas[i:i + 4], 1)[0] for i in range(0, len(entradas), 4)]
+
+        def dos_consultas():
+            # Lectura anterior de mostrar_boleta: encabezado con subconsulta correlacionada y seis joins aparte
+            for id_boleta in ids:
+                with db_manager.conexion() as conn:
+                    encabezado = conn.execute("""
+                        SELECT B.idBoleta, u.nombreUsuario, M.descripcion, B.fechaCompra, B.total
+                        FROM Boleta B
+                        JOIN Usuario u ON u.idUsuario = (
+                            SELECT E.idUsuario FROM Entrada E
+                            JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
+                            WHERE BE.idBoleta = B.idBoleta LIMIT 1
+                        )
+                        JOIN MetodoPago M ON B.idMetodoPago = M.idMetodoPago
+                        WHERE B.idBoleta = ?
+                    """, (id_boleta,)).fetchone()
+                    lineas = conn.execute("""
+                        SELECT P.titulo, H.fecha, H.hora, S.nombreSala, A.idAsiento
+                        FROM BoletaEntrada BE
+                        JOIN Entrada E ON BE.idEntrada = E.idEntrada
+                        JOIN Horario H ON E.idHorario = H.idHorario
+                        JOIN Pelicula P ON H.idPelicula = P.idPelicula
+                        JOIN Sala S ON H.idSala = S.idSala
+                        JOIN Asiento A ON E.idAsiento = A.idAsiento
+                        WHERE BE.idBoleta = ?
+                    """, (id_boleta,)).fetchall()
+                # Se arma el mismo resultado que _consultar_boleta para comparar también ese trabajo
+                boleta = dict(zip(("id", "cliente", "metodo_pago", "fecha_compra", "total"), encabezado))
+                boleta['entradas'] = [dict(zip(("pelicula", "fecha", "hora", "sala", "asiento"), fila)) for fila in lineas]
+
+        def una_consulta():
+            for id_boleta in ids:
+                servicios._consultar_boleta(id_boleta)
+
+        def con_cache():
+            for id_boleta in ids:
+                servicios.obtener_boleta(id_boleta)
+
+        con_cache()
+        lecturas = {"dos consultas": dos_consultas, "una consulta": una_consulta, "caché LRU": con_cache}
+        # Las repeticiones se alternan para que las variaciones de la máquina afecten a todas por igual
+        mejores = {nombre: float("inf") for nombre in lecturas}
+        for _ in range(repeticiones):
+            for nombre, lectura in lecturas.items():
+                mejores[nombre] = min(mejores[nombre], medir(lectura)[1])
+        for nombre, segundos in mejores.items():
+            print(f"{nombre:<14} {len(ids) / segundos:>10.0f} boletas/s")
+        print(f"caché: {servicios.cache_boletas.estadisticas()['tasa_aciertos']:.0%} de aciertos")
+        db_manager.pool.cerrar()
+
+
+def benchmark_sesiones(solicitudes=20000, sesiones=5000):
+    """Autorizar solicitudes: credenciales contra la base de datos frente a tokens en memoria"""
+    print("\n=== SESIONES DE USUARIO ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager, max_sesiones=sesiones)
+        poblar_datos_masivos(db_manager, usuarios=sesiones)
+        with db_manager.conexion() as conn:
+            credenciales = conn.execute(
+                "SELECT nombreUsuario, clave FROM Usuario LIMIT ?", (sesiones,)
+            ).fetchall()
+
+        tokens, segundos = medir(lambda: [servicios.iniciar_sesion(*c).token for c in credenciales])
+        print(f"inicio de sesión   {len(tokens) / segundos:>10.0f} sesiones/s")
+
+        pedidos = [i % len(credenciales) for i in range(solicitudes)]
+        _, con_clave = medir(lambda: [servicios.verificar_usuario(*credenciales[i]) for i in pedidos])
+        _, con_token = medir(lambda: [servicios.autorizar(tokens[i]) for i in pedidos])
+        print(f"usuario y clave    {solicitudes / con_clave:>10.0f} solicitudes/s")
+        print(f"token de sesión    {solicitudes / con_token:>10.0f} solicitudes/s ({con_clave / con_token:.0f}x)")
+
+        # Al superar el máximo se desaloja la sesión usada hace más tiempo
+        servicios.iniciar_sesion(*credenciales[0])
+        assert servicios.autorizar(tokens[0]) is None, "La sesión menos usada no fue desalojada"
+        assert servicios.autorizar(tokens[-1]) is not None
+        assert servicios.autorizar(tokens[-1], "Administrador") is None
+
+        estadisticas = servicios.sesiones.estadisticas()
+        print(f"activas {estadisticas['activas']}, desalojadas {estadisticas['desalojadas']}, "
+              f"búsqueda media {estadisticas['latencia_media_us']:.2f} µs, "
+              f"máxima {estadisticas['latencia_maxima_us']:.1f} µs")
+        db_manager.pool.cerrar()
+
+    # Vencimiento por inactividad con un reloj simulado
+    reloj = [0.0]
+    almacen = SessionStore(ttl=60, reloj=lambda: reloj[0])
+    activa, inactiva = almacen.crear(1, "activa", "Cliente"), almacen.crear(2, "inactiva", "Cliente")
+    reloj[0] = 45
+    almacen.obtener(activa.token)
+    reloj[0] = 90
+    assert almacen.obtener(activa.token) is not None, "La sesión renovada no debe vencer"
+    assert almacen.obtener(inactiva.token) is None, "La sesión inactiva debe vencer"
+    print(f"✅ vencimiento por inactividad: {almacen.estadisticas()['expiradas']} sesión expirada")
+
+
+def _cliente_api(puerto, usuario, clave, hasta, compras_cada, mantener_conexion, resultados):
+    """Cliente de la prueba de carga: repite consultas de cartelera y asientos y compra de vez en cuando"""
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+    latencias, estados = [], {}
+
+    def solicitar(metodo, ruta, cuerpo=None, token=None):
+        nonlocal conexion
+        encabezados = {"Content-Type": "application/json"}
+        if token:
+            encabezados["Authorization"] = f"Bearer {token}"
+        if not mantener_conexion:
+            encabezados["Connection"] = "close"
+        inicio = time.perf_counter()
+        conexion.request(metodo, ruta, json.dumps(cuerpo) if cuerpo is not None else None, encabezados)
+        respuesta = conexion.getresponse()
+        datos = json.loads(respuesta.read())
+        latencias.append(time.perf_counter() - inicio)
+        estados[respuesta.status] = estados.get(respuesta.status, 0) + 1
+        if not mantener_conexion:
+            conexion.close()
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=10)
+        return respuesta.status, datos
+
+    _, sesion = solicitar("POST", "/sesiones", {"usuario": usuario, "clave": clave})
+    token = sesion["token"]
+    _, cartelera = solicitar("GET", "/cartelera")
+    ids_horario = [funcion["id_horario"] for funcion in cartelera]
+    vuelta = 0
+    while time.perf_counter() < hasta:
+        id_horario = random.choice(ids_horario)
+        solicitar("GET", "/cartelera")
+        _, libres = solicitar("GET", f"/horarios/{id_horario}/asientos", token=token)
+        vuelta += 1
+        if libres and vuelta % compras_cada == 0:
+            asiento = random.choice(libres)["id_asiento"]
+            estado, compra = solicitar("POST", f"/horarios/{id_horario}/compras", {"asientos": [asiento]}, token)
+            if estado == 201:
+                entradas = [entrada["id_entrada"] for entrada in compra["entradas"]]
+                estado, checkout = solicitar("POST", "/checkout", {"entradas": entradas, "metodo_pago": 1}, token)
+                if estado == 201:
+                    solicitar("GET", f"/boletas/{checkout['boleta']['id']}", token=token)
+    conexion.close()
+    resultados.append((latencias, estados))
+
+
+def benchmark_api(clientes=8, duracion=3.0, hilos=16, compras_cada=5):
+    """Prueba de carga local de la API HTTP/JSON, con y sin conexiones persistentes"""
+    print("\n=== API HTTP/JSON ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        poblar_datos_masivos(db_manager, salas=10, asientos_por_sala=100, funciones_por_sala=10,
+                             ocupacion=0.3, usuarios=clientes)
+        servidor = CinemaHTTPServer(("127.0.0.1", 0), CinemaServices(db_manager), hilos)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+        try:
+            for nombre, mantener_conexion in (("keep-alive", True), ("sin keep-alive", False)):
+                resultados = []
+                hasta = time.perf_counter() + duracion
+                inicio = time.perf_counter()
+                hilos_clientes = [
+                    threading.Thread(target=_cliente_api, args=(
+                        servidor.server_port, f"cliente{i}", f"clave{i}", hasta, compras_cada,
+                        mantener_conexion, resultados
+                    ))
+                    for i in range(clientes)
+                ]
+                for hilo in hilos_clientes:
+                    hilo.start()
+                for hilo in hilos_clientes:
+                    hilo.join()
+                segundos = time.perf_counter() - inicio
+
+                latencias = sorted(latencia for lista, _ in resultados for latencia in lista)
+                estados = {}
+                for _, por_estado in resultados:
+                    for estado, cantidad in por_estado.items():
+                        estados[estado] = estados.get(estado, 0) + cantidad
+                assert len(resultados) == clientes, "Algún cliente de la prueba falló"
+                assert not any(estado >= 500 for estado in estados), f"Errores del servidor: {estados}"
+                print(f"{nombre:<15} {len(latencias) / segundos:>8.0f} solicitudes/s  "
+                      f"p50 {latencias[len(latencias) // 2] * 1000:.2f} ms  "
+                      f"p99 {latencias[int(len(latencias) * 0.99)] * 1000:.2f} ms  "
+                      f"estados {dict(sorted(estados.items()))}")
+
+            estadisticas = servidor.estadisticas()
+            print(f"{clientes} clientes, {hilos} hilos: {estadisticas['solicitudes']} solicitudes en "
+                  f"{estadisticas['conexiones']} conexiones, "
+                  f"{estadisticas['duracion_media_ms']:.2f} ms de media en el servidor")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+            db_manager.pool.cerrar()
+
+
+def recorridos_consultas_frecuentes():
+    """Trazar las búsquedas frecuentes y devolver, por operación, los recorridos completos de sus planes"""
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager)
+        poblar_datos_masivos(db_manager)
+        with db_manager.conexion() as conn:
+            conn.execute("ANALYZE")
+            id_horario, id_sala = conn.execute(
+                "SELECT idHorario, idSala FROM Horario ORDER BY idHorario DESC LIMIT 1"
+            ).fetchone()
+            id_asiento = conn.execute(
+                "SELECT MAX(idAsiento) FROM Asiento WHERE idSala = ?", (id_sala,)
+            ).fetchone()[0]
+
+            operaciones = [
+                ("ver_asientos_disponibles", lambda: servicios.ver_asientos_disponibles(id_horario)),
+                ("obtener_asientos_compra", lambda: servicios.obtener_asientos_compra(id_horario)),
+                ("obtener_contexto_funcion", lambda: servicios.obtener_contexto_funcion(id_horario)),
+                ("comprar_entrada", lambda: servicios.comprar_entrada(id_horario, 1, id_asiento, 8500)),
+                ("agregar_horario", lambda: servicios.agregar_horario(1, id_sala, "2031-01-01", "10:00")),
+                ("obtener_asientos_sala", lambda: servicios.obtener_asientos_sala(id_sala)),
+                ("eliminar_asiento", lambda: servicios.eliminar_asiento(id_asiento)),
+                ("verificar_usuario", lambda: servicios.verificar_usuario("cliente123", "clave123")),
+                ("ver_entradas_de_boleta", lambda: servicios.ver_entradas_de_boleta(1)),
+                ("iterar_boletas_usuario", lambda: next(servicios.iterar_boletas_usuario(1), None))
+            ]
+
+            resultados = []
+            for nombre, operacion in operaciones:
+                sentencias = []
+                conn.set_trace_callback(sentencias.append)
+                operacion()
+                conn.set_trace_callback(None)
+
+                recorridos = []
+                for sql in sentencias:
+                    if not sql.lstrip().upper().startswith(("SELECT", "INSERT", "DELETE")):
+                        continue
+                    for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+                        detalle = fila[-1]
+                        if detalle.startswith("SCAN"):
+                            recorridos.append(detalle)
+                resultados.append((nombre, recorridos))
+
+        db_manager.pool.cerrar()
+    return resultados
+
+
+def verificar_planes():
+    """Comprobar con EXPLAIN QUERY PLAN que las consultas frecuentes usan índices"""
+    print("\n=== PLANES DE CONSULTA DE LAS BÚSQUEDAS FRECUENTES ===")
+    fallos = 0
+    for nombre, recorridos in recorridos_consultas_frecuentes():
+        estado = "✅" if not recorridos else "❌"
+        print(f"{estado} {nombre:<26} {'; '.join(recorridos) or 'sin recorridos completos'}")
+        fallos += bool(recorridos)
+
+    if fallos:
+        raise RuntimeError(f"{fallos} consultas recorren tablas completas")
+
+
+def contar_sentencias_compra(asientos=3):
+    """Contar sentencias, consultas y lecturas de la función en una compra, por partes y con ShowtimeContext"""
+    with tempfile.TemporaryDirectory() as directorio:
+        db_manager = crear_base_temporal(directorio)
+        servicios = CinemaServices(db_manager)
+        poblar_datos_masivos(db_manager, salas=2, asientos_por_sala=50, funciones_por_sala=4,
+                             ocupacion=0, usuarios=10)
+        horarios = [h[0] for h in servicios.obtener_horarios()]
+
+        def compra_por_partes(id_horario):
+            # Flujo anterior: la función se vuelve a consultar en cada vuelta de la selección
+            titulo = servicios.obtener_info_horario(id_horario)[0]
+            precio = servicios.obtener_precio_pelicula(servicios.obtener_id_pelicula_por_titulo(titulo))
+            elegidos = []
+            for _ in range(asientos):
+                servicios.obtener_id_pelicula_por_titulo(servicios.obtener_info_horario(id_horario)[0])
+                libres = [a[0] for a in servicios.obtener_asientos_compra(id_horario, "s") if a[0] not in elegidos]
+                elegidos += servicios.reservar_asientos("s", id_horario, libres[:1])[0]
+            return finalizar(id_horario, elegidos, precio, "s")
+
+        def compra_con_contexto(id_horario):
+            contexto = servicios.obtener_contexto_funcion(id_horario)
+            elegidos = []
+            for _ in range(asientos):
+                libres = [a[0] for a in servicios.obtener_asientos_compra(id_horario, "c") if a[0] not in elegidos]
+                elegidos += servicios.reservar_asientos("c", id_horario, libres[:1])[0]
+            return finalizar(id_horario, elegidos, contexto.precio, "c")
+
+        def finalizar(id_horario, elegidos, precio, sesion):
+            resultados, _ = servicios.comprar_entradas(id_horario, 1, elegidos, precio, sesion)
+            servicios.obtener_metodos_pago()
+            return servicios.checkout([r['id_entrada'] for r in resultados], 1)[0]
+
+        conteos = {}
+        with db_manager.conexion() as conn:
+            for nombre, compra, id_horario in (("por partes", compra_por_partes, horarios[0]),
+                                               ("con contexto", compra_con_contexto, horarios[1])):
+                # Las cachés arrancan frías en ambos casos
+                servicios.invalidar_cache("precio_pelicula", "metodos_pago")
+                sentencias = []
+                conn.set_trace_callback(sentencias.append)
+                id_boleta = compra(id_horario)
+                conn.set_trace_callback(None)
+                # Los triggers vuelven a informar la sentencia que los disparó: se cuenta una vez
+                sentencias = [sql for i, sql in enumerate(sentencias) if i == 0 or sql != sentencias[i - 1]]
+                consultas = [sql for sql in sentencias if sql.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE"))]
+                de_funcion = [sql for sql in consultas if "Pelicula" in sql]
+                conteos[nombre] = (id_boleta, len(sentencias), len(consultas), len(de_funcion))
+        db_manager.pool.cerrar()
+    return conteos
+
+
+def verificar_consultas_compra(asientos=3):
+    """Contar las sentencias SQL de una compra completa, con y sin ShowtimeContext"""
+    print("\n=== SENTENCIAS SQL POR COMPRA ===")
+    conteos = contar_sentencias_compra(asientos)
+    for nombre, (id_boleta, sentencias, consultas, de_funcion) in conteos.items():
+        print(f"{nombre:<13} boleta {id_boleta}: {sentencias:>3} sentencias, "
+              f"{consultas:>3} consultas, {de_funcion} sobre la película de la función")
+
+    if conteos["con contexto"][3] != 1:
+        raise RuntimeError("La compra con contexto debe leer la función una sola vez")
+    if conteos["con contexto"][1] >= conteos["por partes"][1]:
+        raise RuntimeError("La compra con contexto debe ejecutar menos sentencias que la compra por partes")
+
+
+BENCHMARKS = {
+    "perfiles": benchmark_perfiles,
+    "disponibilidad": benchmark_disponibilidad,
+    "compra_grupal": benchmark_compra_grupal,
+    "async": benchmark_async,
+    "exportacion": benchmark_exportacion,
+    "analitica": benchmark_analitica,
+    "reportes": benchmark_reportes,
+    "importacion": benchmark_importacion,
+    "programacion": benchmark_programacion,
+    "asientos": benchmark_asientos,
+    "historial": benchmark_historial,
+    "boletas": benchmark_boletas,
+    "sesiones": benchmark_sesiones,
+    "api": benchmark_api,
+    "planes": verificar_planes,
+    "consultas_compra": verificar_consultas_compra
+}
+
+
+def main(nombres):
+    for nombre in nombres or BENCHMARKS:
+        if nombre not in BENCHMARKS:
+            print(f"❌ Benchmark desconocido: {nombre}")
+            continue
+        BENCHMARKS[nombre]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
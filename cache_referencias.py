@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ReferenceCache:
+    """Caché LRU con vencimiento opcional para datos de referencia que casi no cambian"""
+    
+    def __init__(self, max_entradas=256, ttl=None, reloj=time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        # clave -> (valor, instante de carga); las claves son tuplas cuyo primer elemento es el grupo
+        self._entradas = OrderedDict()
+        # Cambia con cada invalidación para descartar cargas que empezaron antes
+        self._generacion = 0
+        
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+    
+    def obtener(self, clave, cargar):
+        """Devolver el valor en caché o cargarlo con la función indicada"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                valor, cargado = entrada
+                if self.ttl is None or self._reloj() - cargado < self.ttl:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._entradas[clave]
+            self.fallos += 1
+            generacion = self._generacion
+        
+        # La carga se hace fuera del lock para no bloquear otras lecturas
+        valor = cargar()
+        if valor is None:
+            return None
+        
+        with self._lock:
+            if generacion != self._generacion:
+                return valor
+            self._entradas[clave] = (valor, self._reloj())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return valor
+    
+    def invalidar(self, *grupos):
+        """Descartar todas las entradas de los grupos indicados"""
+        with self._lock:
+            claves = [clave for clave in self._entradas if clave[0] in grupos]
+            for clave in claves:
+                del self._entradas[clave]
+            self._generacion += 1
+            self.invalidaciones += 1
+    
+    def limpiar(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._entradas.clear()
+            self._generacion += 1
+            self.invalidaciones += 1
+    
+    def estadisticas(self):
+        """Obtener aciertos, fallos y ocupación de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'invalidaciones': self.invalidaciones
+            }
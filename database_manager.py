@@ -1,39 +1,326 @@
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Perfiles de rendimiento que se aplican a cada conexión entregada
+PERFILES = {
+    "kiosk": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -8000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000
+    },
+    "batch-load": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000
+    },
+    "readonly-report": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+        "query_only": "ON"
+    },
+    # Valores por defecto de SQLite, para discos de red donde WAL no es seguro
+    "compat": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000
+    }
+}
+
+PERFIL_POR_DEFECTO = "kiosk"
+
+# Índices secundarios para las búsquedas frecuentes de los servicios
+INDICES = {
+    "idx_entrada_horario_asiento": "Entrada (idHorario, idAsiento)",
+    "idx_entrada_asiento": "Entrada (idAsiento)",
+    "idx_horario_sala_fecha_hora": "Horario (idSala, fecha, hora)",
+    "idx_asiento_sala_codigo": "Asiento (idSala, codigo)",
+    "idx_boleta_entrada_entrada": "BoletaEntrada (idEntrada)",
+    "idx_usuario_nombre": "Usuario (nombreUsuario)"
+}
+
+# Índices para los listados paginados por clave (fecha, hora) y por título
+INDICES_PAGINACION = {
+    "idx_horario_fecha_hora": "Horario (fecha, hora)",
+    "idx_pelicula_titulo": "Pelicula (titulo)"
+}
+
+# Índice de la clave de paginación de horarios: fecha y hora admiten NULL y se ordenan como ''
+INDICES_CLAVE_HORARIO = {
+    "idx_horario_clave_pagina": "Horario (COALESCE(fecha, ''), COALESCE(hora, ''))"
+}
+
+# Índice del historial de compras de cada cliente (Boleta.idUsuario, migración 6)
+INDICES_HISTORIAL = {
+    "idx_boleta_usuario": "Boleta (idUsuario, idBoleta)"
+}
+
+class ConnectionPool:
+    """Pool acotado de conexiones SQLite reutilizables entre hilos"""
+    
+    def __init__(self, fabrica, tamano_maximo=5, timeout=5.0):
+        self._fabrica = fabrica
+        self.tamano_maximo = tamano_maximo
+        self.timeout = timeout
+        self._libres = []
+        self._creadas = 0
+        self._condicion = threading.Condition()
+        self._local = threading.local()
+        
+        # Contadores del pool
+        self.aciertos = 0
+        self.conexiones_nuevas = 0
+        self.descartadas = 0
+        self.esperas = 0
+        self.tiempo_espera = 0.0
+    
+    def _conexion_sana(self, conn):
+        """Comprobar que una conexión ociosa sigue siendo utilizable"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def obtener(self):
+        """Tomar una conexión del pool, esperando si está agotado"""
+        inicio_espera = None
+        with self._condicion:
+            while True:
+                if self._libres:
+                    conn = self._libres.pop()
+                    if self._conexion_sana(conn):
+                        self.aciertos += 1
+                        break
+                    # Conexión rota: se descarta y se libera su cupo
+                    self.descartadas += 1
+                    self._creadas -= 1
+                    try:
+                        conn.close()
+                    except sqlite3.Error:
+                        pass
+                    continue
+                
+                if self._creadas < self.tamano_maximo:
+                    self._creadas += 1
+                    self.conexiones_nuevas += 1
+                    conn = None
+                    break
+                
+                # Pool agotado: esperar a que otro hilo devuelva una conexión
+                if inicio_espera is None:
+                    inicio_espera = time.perf_counter()
+                    self.esperas += 1
+                restante = self.timeout - (time.perf_counter() - inicio_espera)
+                if restante <= 0:
+                    self.tiempo_espera += time.perf_counter() - inicio_espera
+                    raise sqlite3.OperationalError("Pool de conexiones agotado")
+                self._condicion.wait(restante)
+            
+            if inicio_espera is not None:
+                self.tiempo_espera += time.perf_counter() - inicio_espera
+        
+        if conn is None:
+            try:
+                conn = self._fabrica()
+            except Exception:
+                with self._condicion:
+                    self._creadas -= 1
+                    self._condicion.notify()
+                raise
+        return conn
+    
+    def devolver(self, conn):
+        """Devolver una conexión al pool dejando limpia cualquier transacción"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Si no se puede limpiar, no se reutiliza
+            with self._condicion:
+                self.descartadas += 1
+                self._creadas -= 1
+                self._condicion.notify()
+            conn.close()
+            return
+        
+        with self._condicion:
+            self._libres.append(conn)
+            self._condicion.notify()
+    
+    def ampliar(self, minimo):
+        """Garantizar al menos `minimo` conexiones, despertando a los hilos que esperaban un cupo"""
+        with self._condicion:
+            if minimo > self.tamano_maximo:
+                self.tamano_maximo = minimo
+                self._condicion.notify_all()
+    
+    @contextmanager
+    def conexion(self, compartida=True):
+        """Prestar una conexión; las llamadas anidadas en el mismo hilo la reutilizan"""
+        if not compartida:
+            # Préstamo exclusivo, p. ej. para generadores que pueden reanudarse en otro hilo
+            conn = self.obtener()
+            try:
+                yield conn
+            finally:
+                self.devolver(conn)
+            return
+        
+        actual = getattr(self._local, "conn", None)
+        if actual is not None:
+            self._local.profundidad += 1
+            try:
+                yield actual
+            finally:
+                self._local.profundidad -= 1
+            return
+        
+        conn = self.obtener()
+        self._local.conn = conn
+        self._local.profundidad = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.profundidad = 0
+            self.devolver(conn)
+    
+    def estadisticas(self):
+        """Obtener los contadores de uso del pool"""
+        with self._condicion:
+            return {
+                'tamano_maximo': self.tamano_maximo,
+                'creadas': self._creadas,
+                'libres': len(self._libres),
+                'aciertos': self.aciertos,
+                'conexiones_nuevas': self.conexiones_nuevas,
+                'descartadas': self.descartadas,
+                'esperas': self.esperas,
+                'tiempo_espera': self.tiempo_espera
+            }
+    
+    def cerrar(self):
+        """Cerrar todas las conexiones ociosas del pool"""
+        with self._condicion:
+            while self._libres:
+                self._libres.pop().close()
+                self._creadas -= 1
+
 
 class DatabaseManager:
-    def __init__(self, db_name="cine.db"):
+    def __init__(self, db_name="cine.db", tamano_pool=5, perfil=PERFIL_POR_DEFECTO):
+        if perfil not in PERFILES:
+            raise ValueError(f"Perfil de base de datos desconocido: {perfil}")
         self.db_name = db_name
+        self.perfil = perfil
+        self.pool = ConnectionPool(self._nueva_conexion_pool, tamano_pool)
         self.crear_base_datos()
     
+    def _aplicar_perfil(self, conn, solo_lectura=True):
+        """Aplicar los PRAGMA del perfil configurado a una conexión"""
+        for pragma, valor in PERFILES[self.perfil].items():
+            if pragma == "query_only" and not solo_lectura:
+                continue
+            conn.execute(f"PRAGMA {pragma} = {valor}")
+        return conn
+    
     def conectar(self):
         """Crear conexión a la base de datos"""
-        return sqlite3.connect(self.db_name)
+        return self._aplicar_perfil(sqlite3.connect(self.db_name))
+    
+    def _nueva_conexion_pool(self):
+        """Crear una conexión apta para moverse entre hilos dentro del pool"""
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        return self._aplicar_perfil(conn)
+    
+    def conexion(self, compartida=True):
+        """Prestar una conexión del pool como context manager"""
+        return self.pool.conexion(compartida)
     
     def verificar_conexion(self):
         """Verificar si la conexión a la base de datos es exitosa"""
         try:
-            conn = self.conectar()
-            conn.close()
+            with self.conexion() as conn:
+                conn.execute("SELECT 1")
             return True
         except sqlite3.Error:
             return False
     
+    def _migraciones(self):
+        """Migraciones numeradas del esquema, en orden de aplicación"""
+        return [
+            (1, "Esquema inicial y datos de ejemplo", self._migrar_esquema_inicial),
+            (2, "Índices de búsquedas frecuentes", self._crear_indices),
+            (3, "Índices de listados paginados", lambda cursor: self._crear_indices(cursor, INDICES_PAGINACION)),
+            (4, "Tablas de estadísticas mantenidas por triggers", self._crear_estadisticas),
+            (5, "Capacidad de las salas igual a sus asientos", self._sincronizar_capacidad_salas),
+            (6, "Usuario comprador en cada boleta", self._vincular_boletas_usuarios),
+            (7, "Versión de la cartelera mantenida por triggers", self._crear_version_cartelera),
+            (8, "Versión de las entradas de cada función mantenida por triggers", self._crear_version_horarios),
+            (9, "Índice de la clave de paginación de horarios", lambda cursor: self._crear_indices(cursor, INDICES_CLAVE_HORARIO))
+        ]
+    
+    def version_esquema(self, conn):
+        """Leer la versión de esquema registrada en PRAGMA user_version"""
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    
     def crear_base_datos(self):
-        """Crear todas las tablas e insertar datos iniciales"""
-        conn = self.conectar()
+        """Aplicar solo las migraciones pendientes del esquema"""
+        inicio = time.perf_counter()
+        migraciones = self._migraciones()
+        version_actual = migraciones[-1][0]
+        
+        # Con el esquema al día basta con leer user_version desde el pool
+        with self.conexion() as conn:
+            version = self.version_esquema(conn)
+        
+        self.migraciones_aplicadas = []
+        if version < version_actual:
+            self._aplicar_migraciones(migraciones, version)
+        
+        self.version = version_actual
+        self.tiempo_inicio_ms = (time.perf_counter() - inicio) * 1000
+    
+    def _aplicar_migraciones(self, migraciones, version):
+        """Ejecutar en orden las migraciones posteriores a la versión indicada"""
+        # El esquema se crea siempre con permiso de escritura, aunque el perfil sea de solo lectura
+        conn = self._aplicar_perfil(sqlite3.connect(self.db_name), solo_lectura=False)
         cursor = conn.cursor()
         
         # Activar claves foráneas
         cursor.execute("PRAGMA foreign_keys = ON")
         
+        try:
+            for numero, descripcion, migrar in migraciones:
+                if numero <= version:
+                    continue
+                # Cada migración es idempotente: si falla a medias se repite completa
+                migrar(cursor)
+                cursor.execute(f"PRAGMA user_version = {numero}")
+                conn.commit()
+                self.migraciones_aplicadas.append((numero, descripcion))
+        finally:
+            conn.close()
+    
+    def _migrar_esquema_inicial(self, cursor):
+        """Crear todas las tablas e insertar datos iniciales"""
         # Crear tablas
         self._crear_tablas(cursor)
         
         # Insertar datos iniciales si no existen
         self._insertar_datos_iniciales(cursor)
-        
-        conn.commit()
-        conn.close()
     
     def _crear_tablas(self, cursor):
         """Crear todas las tablas del sistema"""
@@ -121,7 +408,7 @@ class DatabaseManager:
             FOREIGN KEY (idEntrada) REFERENCES Entrada(idEntrada),
             FOREIGN KEY (idMetodoPago) REFERENCES MetodoPago(idMetodoPago)
         );
-
+        
         CREATE TABLE IF NOT EXISTS BoletaEntrada (
             idBoleta INTEGER,
             idEntrada INTEGER,
@@ -134,6 +421,228 @@ class DatabaseManager:
         
         cursor.executescript(tablas_sql)
     
+    def _crear_indices(self, cursor, indices=INDICES):
+        """Crear los índices secundarios que aún no existan"""
+        for nombre, definicion in indices.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}")
+    
+    def _crear_estadisticas(self, cursor):
+        """Crear las tablas resumen de ventas y los triggers que las mantienen al día"""
+        estadisticas_sql = """
+        CREATE TABLE IF NOT EXISTS EstadisticaPelicula (
+            idPelicula INTEGER PRIMARY KEY,
+            vistas INTEGER NOT NULL DEFAULT 0,
+            recaudacion INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (idPelicula) REFERENCES Pelicula(idPelicula)
+        );
+        
+        CREATE TABLE IF NOT EXISTS EstadisticaGenero (
+            idGenero INTEGER PRIMARY KEY,
+            vistas INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (idGenero) REFERENCES Genero(idGenero)
+        );
+        
+        CREATE TABLE IF NOT EXISTS EstadisticaHora (
+            hora TEXT PRIMARY KEY,
+            cantidad INTEGER NOT NULL DEFAULT 0
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS trg_estadisticas_entrada_insert
+        AFTER INSERT ON Entrada
+        BEGIN
+            INSERT INTO EstadisticaPelicula (idPelicula, vistas, recaudacion)
+            SELECT H.idPelicula, 1, COALESCE(NEW.precio, 0)
+            FROM Horario H
+            JOIN Pelicula P ON P.idPelicula = H.idPelicula
+            WHERE H.idHorario = NEW.idHorario
+            ON CONFLICT (idPelicula) DO UPDATE SET
+                vistas = vistas + 1,
+                recaudacion = recaudacion + excluded.recaudacion;
+            
+            INSERT INTO EstadisticaGenero (idGenero, vistas)
+            SELECT G.idGenero, 1
+            FROM Horario H
+            JOIN Pelicula P ON P.idPelicula = H.idPelicula
+            JOIN Genero G ON G.idGenero = P.idGenero
+            WHERE H.idHorario = NEW.idHorario
+            ON CONFLICT (idGenero) DO UPDATE SET vistas = vistas + 1;
+            
+            INSERT INTO EstadisticaHora (hora, cantidad)
+            SELECT H.hora, 1
+            FROM Horario H
+            WHERE H.idHorario = NEW.idHorario AND H.hora IS NOT NULL
+            ON CONFLICT (hora) DO UPDATE SET cantidad = cantidad + 1;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_estadisticas_entrada_delete
+        AFTER DELETE ON Entrada
+        BEGIN
+            UPDATE EstadisticaPelicula
+            SET vistas = vistas - 1, recaudacion = recaudacion - COALESCE(OLD.precio, 0)
+            WHERE idPelicula = (SELECT idPelicula FROM Horario WHERE idHorario = OLD.idHorario);
+            
+            UPDATE EstadisticaGenero
+            SET vistas = vistas - 1
+            WHERE idGenero = (
+                SELECT P.idGenero FROM Horario H
+                JOIN Pelicula P ON P.idPelicula = H.idPelicula
+                WHERE H.idHorario = OLD.idHorario
+            );
+            
+            UPDATE EstadisticaHora
+            SET cantidad = cantidad - 1
+            WHERE hora = (SELECT hora FROM Horario WHERE idHorario = OLD.idHorario);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_estadisticas_entrada_precio
+        AFTER UPDATE OF precio ON Entrada
+        BEGIN
+            UPDATE EstadisticaPelicula
+            SET recaudacion = recaudacion - COALESCE(OLD.precio, 0) + COALESCE(NEW.precio, 0)
+            WHERE idPelicula = (SELECT idPelicula FROM Horario WHERE idHorario = NEW.idHorario);
+        END;
+        """
+        cursor.executescript(estadisticas_sql)
+        self.recalcular_estadisticas(cursor)
+    
+    def recalcular_estadisticas(self, cursor):
+        """Reconstruir las tablas resumen agregando de nuevo todas las entradas"""
+        cursor.execute("DELETE FROM EstadisticaPelicula")
+        cursor.execute("""
+            INSERT INTO EstadisticaPelicula (idPelicula, vistas, recaudacion)
+            SELECT H.idPelicula, COUNT(*), COALESCE(SUM(E.precio), 0)
+            FROM Entrada E
+            JOIN Horario H ON E.idHorario = H.idHorario
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            GROUP BY H.idPelicula
+        """)
+        
+        cursor.execute("DELETE FROM EstadisticaGenero")
+        cursor.execute("""
+            INSERT INTO EstadisticaGenero (idGenero, vistas)
+            SELECT G.idGenero, COUNT(*)
+            FROM Entrada E
+            JOIN Horario H ON E.idHorario = H.idHorario
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            JOIN Genero G ON P.idGenero = G.idGenero
+            GROUP BY G.idGenero
+        """)
+        
+        cursor.execute("DELETE FROM EstadisticaHora")
+        cursor.execute("""
+            INSERT INTO EstadisticaHora (hora, cantidad)
+            SELECT H.hora, COUNT(*)
+            FROM Entrada E
+            JOIN Horario H ON E.idHorario = H.idHorario
+            WHERE H.hora IS NOT NULL
+            GROUP BY H.hora
+        """)
+    
+    def _sincronizar_capacidad_salas(self, cursor):
+        """Igualar la capacidad de cada sala con asientos a la cantidad que tiene registrados"""
+        cursor.execute("""
+            UPDATE Sala
+            SET capacidad = (SELECT COUNT(*) FROM Asiento A WHERE A.idSala = Sala.idSala)
+            WHERE EXISTS (SELECT 1 FROM Asiento A WHERE A.idSala = Sala.idSala)
+        """)
+    
+    def _vincular_boletas_usuarios(self, cursor):
+        """Guardar en cada boleta el usuario de sus entradas, indexado para listar su historial"""
+        columnas = {fila[1] for fila in cursor.execute("PRAGMA table_info(Boleta)").fetchall()}
+        if "idUsuario" not in columnas:
+            cursor.execute("ALTER TABLE Boleta ADD COLUMN idUsuario INTEGER REFERENCES Usuario(idUsuario)")
+        
+        # Boletas existentes: el usuario sale de sus entradas (o de la entrada única de las boletas antiguas)
+        cursor.execute("""
+            UPDATE Boleta
+            SET idUsuario = COALESCE(
+                (SELECT E.idUsuario FROM BoletaEntrada BE
+                 JOIN Entrada E ON E.idEntrada = BE.idEntrada
+                 WHERE BE.idBoleta = Boleta.idBoleta LIMIT 1),
+                (SELECT E.idUsuario FROM Entrada E WHERE E.idEntrada = Boleta.idEntrada)
+            )
+            WHERE idUsuario IS NULL
+        """)
+        self._crear_indices(cursor, INDICES_HISTORIAL)
+        
+        # Boletas nuevas: el usuario se completa al asociar la primera entrada, sea cual sea el camino
+        cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS trg_boleta_usuario_entrada
+        AFTER INSERT ON BoletaEntrada
+        BEGIN
+            UPDATE Boleta
+            SET idUsuario = (SELECT idUsuario FROM Entrada WHERE idEntrada = NEW.idEntrada)
+            WHERE idBoleta = NEW.idBoleta AND idUsuario IS NULL;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_boleta_usuario_directa
+        AFTER INSERT ON Boleta
+        WHEN NEW.idEntrada IS NOT NULL AND NEW.idUsuario IS NULL
+        BEGIN
+            UPDATE Boleta
+            SET idUsuario = (SELECT idUsuario FROM Entrada WHERE idEntrada = NEW.idEntrada)
+            WHERE idBoleta = NEW.idBoleta;
+        END;
+        """)
+    
+    def _crear_version_cartelera(self, cursor):
+        """Contador que sube en la misma transacción que cualquier cambio visible en la cartelera"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS VersionCartelera (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO VersionCartelera (id, version) VALUES (1, 0)")
+        
+        # Los triggers cubren también las escrituras de otros procesos sobre el mismo archivo
+        for tabla, actualizacion in (
+            ("Horario", "UPDATE"),
+            ("Pelicula", "UPDATE OF titulo, precioEntrada"),
+            ("Sala", "UPDATE OF nombreSala")
+        ):
+            for evento in ("INSERT", "DELETE", actualizacion):
+                nombre = f"trg_cartelera_{tabla.lower()}_{evento.split()[0].lower()}"
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {nombre}
+                    AFTER {evento} ON {tabla}
+                    BEGIN
+                        UPDATE VersionCartelera SET version = version + 1 WHERE id = 1;
+                    END
+                """)
+    
+    def _crear_version_horarios(self, cursor):
+        """Contador por función que sube con cada venta o anulación, visible para todos los procesos"""
+        cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS VersionHorario (
+            idHorario INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS trg_version_horario_insert
+        AFTER INSERT ON Entrada
+        BEGIN
+            INSERT INTO VersionHorario (idHorario, version) VALUES (NEW.idHorario, 1)
+            ON CONFLICT (idHorario) DO UPDATE SET version = version + 1;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_version_horario_delete
+        AFTER DELETE ON Entrada
+        BEGIN
+            INSERT INTO VersionHorario (idHorario, version) VALUES (OLD.idHorario, 1)
+            ON CONFLICT (idHorario) DO UPDATE SET version = version + 1;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_version_horario_update
+        AFTER UPDATE OF idHorario, idAsiento ON Entrada
+        BEGIN
+            INSERT INTO VersionHorario (idHorario, version) VALUES (OLD.idHorario, 1)
+            ON CONFLICT (idHorario) DO UPDATE SET version = version + 1;
+            INSERT INTO VersionHorario (idHorario, version) VALUES (NEW.idHorario, 1)
+            ON CONFLICT (idHorario) DO UPDATE SET version = version + 1;
+        END;
+        """)
+    
     def _insertar_datos_iniciales(self, cursor):
         """Insertar datos iniciales si las tablas están vacías"""
         # Verificar si ya existen datos
@@ -170,4 +679,4 @@ class DatabaseManager:
             
             INSERT INTO Empleado (idUsuario, rol) VALUES (2, 'Administrador General');
             """
-            cursor.executescript(datos_iniciales) 
\ No newline at end of file
+            cursor.executescript(datos_iniciales)
\ No newline at end of file
@@ -0,0 +1,152 @@
+import threading
+
+class SeatAvailabilityIndex:
+    """Mapa de bits en memoria con los asientos ocupados de cada función"""
+    
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.RLock()
+        # idSala -> (nombreSala, [(idAsiento, codigo)] ordenados por código, {idAsiento: posición})
+        self._salas = {}
+        # idHorario -> (idSala, bytearray con un bit por posición de asiento, versión de VersionHorario)
+        self._horarios = {}
+    
+    def _cargar_sala(self, conn, id_sala):
+        """Leer la distribución de asientos de una sala"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT nombreSala FROM Sala WHERE idSala = ?", (id_sala,))
+        fila = cursor.fetchone()
+        nombre_sala = fila[0] if fila else None
+        
+        cursor.execute("""
+            SELECT idAsiento, codigo
+            FROM Asiento
+            WHERE idSala = ?
+            ORDER BY codigo
+        """, (id_sala,))
+        asientos = cursor.fetchall()
+        posiciones = {id_asiento: i for i, (id_asiento, _) in enumerate(asientos)}
+        
+        self._salas[id_sala] = (nombre_sala, asientos, posiciones)
+        return self._salas[id_sala]
+    
+    def _version(self, cursor, id_horario):
+        """Versión de las entradas de una función; cambia con las ventas de cualquier proceso"""
+        cursor.execute("SELECT version FROM VersionHorario WHERE idHorario = ?", (id_horario,))
+        fila = cursor.fetchone()
+        return fila[0] if fila else 0
+    
+    def _cargar_horario(self, id_horario):
+        """Obtener el mapa de bits de una función, reconstruyéndolo si otra conexión vendió desde la carga"""
+        # La versión se lee antes que las entradas: una venta intermedia solo provoca otra recarga
+        with self.db_manager.conexion() as conn:
+            version = self._version(conn.cursor(), id_horario)
+        
+        with self._lock:
+            horario = self._horarios.get(id_horario)
+            if horario is not None and horario[2] == version:
+                return horario
+            
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT idSala FROM Horario WHERE idHorario = ?", (id_horario,))
+                fila = cursor.fetchone()
+                if not fila:
+                    return None
+                id_sala = fila[0]
+                
+                sala = self._salas.get(id_sala) or self._cargar_sala(conn, id_sala)
+                posiciones = sala[2]
+                ocupados = bytearray((len(posiciones) + 7) // 8)
+                
+                cursor.execute("SELECT idAsiento FROM Entrada WHERE idHorario = ?", (id_horario,))
+                for (id_asiento,) in cursor:
+                    posicion = posiciones.get(id_asiento)
+                    if posicion is not None:
+                        ocupados[posicion >> 3] |= 1 << (posicion & 7)
+            
+            self._horarios[id_horario] = (id_sala, ocupados, version)
+            return self._horarios[id_horario]
+    
+    def asientos_libres(self, id_horario):
+        """Listar (idAsiento, codigo, nombreSala) de los asientos libres de una función"""
+        with self._lock:
+            horario = self._cargar_horario(id_horario)
+            if horario is None:
+                return []
+            id_sala, ocupados, _ = horario
+            nombre_sala, asientos, _ = self._salas[id_sala]
+            
+            return [
+                (id_asiento, codigo, nombre_sala)
+                for posicion, (id_asiento, codigo) in enumerate(asientos)
+                if not ocupados[posicion >> 3] & (1 << (posicion & 7))
+            ]
+    
+    def esta_ocupado(self, id_horario, id_asiento):
+        """Indicar si un asiento está vendido; None si no pertenece a la sala de la función"""
+        with self._lock:
+            horario = self._cargar_horario(id_horario)
+            if horario is None:
+                return None
+            id_sala, ocupados, _ = horario
+            posicion = self._salas[id_sala][2].get(id_asiento)
+            if posicion is None:
+                return None
+            return bool(ocupados[posicion >> 3] & (1 << (posicion & 7)))
+    
+    def marcar_ocupado(self, id_horario, id_asiento):
+        """Registrar una venta en el mapa de la función, si ya está cargado"""
+        with self._lock:
+            horario = self._horarios.get(id_horario)
+            if horario is None:
+                return
+            id_sala, ocupados, _ = horario
+            posicion = self._salas[id_sala][2].get(id_asiento)
+            if posicion is not None:
+                ocupados[posicion >> 3] |= 1 << (posicion & 7)
+    
+    def invalidar_horario(self, id_horario):
+        """Descartar el mapa de una función para que se reconstruya al usarse"""
+        with self._lock:
+            self._horarios.pop(id_horario, None)
+    
+    def invalidar_sala(self, id_sala):
+        """Descartar la distribución de una sala y los mapas de sus funciones"""
+        with self._lock:
+            self._salas.pop(id_sala, None)
+            for id_horario in [h for h, (s, _, _) in self._horarios.items() if s == id_sala]:
+                del self._horarios[id_horario]
+    
+    def invalidar_asiento(self, id_asiento):
+        """Descartar la sala en memoria que contenga un asiento modificado"""
+        with self._lock:
+            for id_sala, (_, _, posiciones) in list(self._salas.items()):
+                if id_asiento in posiciones:
+                    self.invalidar_sala(id_sala)
+    
+    def verificar_consistencia(self, id_horario):
+        """Comparar el mapa en memoria con la base de datos y reconstruirlo si difiere"""
+        with self._lock:
+            en_memoria = self.asientos_libres(id_horario)
+            self.invalidar_horario(id_horario)
+            # Se recarga sala y entradas directamente desde la base de datos
+            with self.db_manager.conexion() as conn:
+                fila = conn.execute(
+                    "SELECT idSala FROM Horario WHERE idHorario = ?", (id_horario,)
+                ).fetchone()
+                if fila:
+                    self._cargar_sala(conn, fila[0])
+            en_base_datos = self.asientos_libres(id_horario)
+            
+            return {
+                'consistente': en_memoria == en_base_datos,
+                'sobrantes': sorted(set(en_memoria) - set(en_base_datos)),
+                'faltantes': sorted(set(en_base_datos) - set(en_memoria))
+            }
+    
+    def limpiar(self):
+        """Vaciar todo el índice en memoria"""
+        with self._lock:
+            self._salas.clear()
+            self._horarios.clear()
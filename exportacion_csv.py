@@ -0,0 +1,39 @@
+import csv
+import gzip
+import time
+
+def abrir_destino(nombre_archivo, comprimir=False):
+    """Abrir el archivo de salida en modo texto, comprimido con gzip si se pide"""
+    if comprimir:
+        if not nombre_archivo.endswith(".gz"):
+            nombre_archivo += ".gz"
+        return nombre_archivo, gzip.open(nombre_archivo, mode='wt', newline='', encoding='utf-8')
+    return nombre_archivo, open(nombre_archivo, mode='w', newline='', encoding='utf-8')
+
+
+def exportar_filas(nombre_archivo, encabezados, filas, comprimir=False, tamano_lote=1000):
+    """Escribir filas a CSV a medida que llegan, sin materializar el listado completo"""
+    inicio = time.perf_counter()
+    cantidad = 0
+    nombre_archivo, archivo = abrir_destino(nombre_archivo, comprimir)
+    
+    with archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(encabezados)
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= tamano_lote:
+                escritor.writerows(lote)
+                cantidad += len(lote)
+                lote.clear()
+        escritor.writerows(lote)
+        cantidad += len(lote)
+    
+    segundos = time.perf_counter() - inicio
+    return {
+        'archivo': nombre_archivo,
+        'filas': cantidad,
+        'segundos': segundos,
+        'filas_por_segundo': cantidad / segundos if segundos > 0 else float(cantidad)
+    }
@@ -0,0 +1,18 @@
+import csv
+import gzip
+
+def leer_filas(nombre_archivo, saltar_encabezado=True):
+    """Leer un CSV (o CSV.gz) fila a fila, sin cargar el archivo completo"""
+    if nombre_archivo.endswith(".gz"):
+        archivo = gzip.open(nombre_archivo, mode='rt', newline='', encoding='utf-8')
+    else:
+        archivo = open(nombre_archivo, mode='r', newline='', encoding='utf-8')
+    
+    with archivo:
+        lector = csv.reader(archivo)
+        if saltar_encabezado:
+            next(lector, None)
+        for fila in lector:
+            # Las líneas en blanco no cuentan como filas
+            if fila:
+                yield fila
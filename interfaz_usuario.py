@@ -1,8 +1,11 @@
 from typing import Self
 from servicios_del_cine import CinemaServices
-import os
 import csv
-import sqlite3
+import os
+import time
+import uuid
+from exportacion_csv import exportar_filas
+from importacion_csv import leer_filas
 
 def limpiar_terminal():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -12,13 +15,20 @@ class UserInterface:
         self.cinema_services = cinema_services
         self.usuario_actual = None
 
-    def exportar_csv(self, nombre_archivo, encabezados, datos):
-        """Exportar datos a archivo CSV"""
-        with open(nombre_archivo, mode='w', newline='', encoding='utf-8') as archivo:
-            escritor = csv.writer(archivo)
-            escritor.writerow(encabezados)
-            escritor.writerows(datos)
-        print(f"✅ Archivo '{nombre_archivo}' generado correctamente.\n")
+    def exportar_csv(self, nombre_archivo, encabezados, datos, comprimir=False):
+        """Exportar datos a archivo CSV (acepta listas o generadores de filas)"""
+        resultado = exportar_filas(nombre_archivo, encabezados, datos, comprimir)
+        print(f"✅ Archivo '{resultado['archivo']}' generado correctamente.")
+        print(f"   {resultado['filas']} filas en {resultado['segundos']:.2f} s "
+              f"({resultado['filas_por_segundo']:.0f} filas/s)\n")
+
+    def paginar(self, primera_pagina, paginas):
+        """Recorrer un listado página a página, preguntando antes de mostrar la siguiente"""
+        yield from primera_pagina
+        for pagina in paginas:
+            if input("\n-- Enter para ver más, 'q' para terminar: ").strip().lower() == 'q':
+                return
+            yield from pagina
     
     def mostrar_menu_principal(self):
         """Mostrar menú principal"""
@@ -34,7 +44,7 @@ class UserInterface:
         """Mostrar menú para clientes"""
         limpiar_terminal()
         print("\n" + "="*50)
-        print(f"🎬 BIENVENIDO {self.usuario_actual[1]} 🎬")
+        print(f"🎬 BIENVENIDO {self.usuario_actual.nombre_usuario} 🎬")
         print("="*50)
         print("1. Ver cartelera")
         print("2. Comprar entrada")
@@ -46,7 +56,7 @@ class UserInterface:
         """Mostrar menú para administradores"""
         limpiar_terminal()
         print("\n" + "="*50)
-        print(f"👑 PANEL DE ADMINISTRACIÓN - {self.usuario_actual[1]} 👑")
+        print(f"👑 PANEL DE ADMINISTRACIÓN - {self.usuario_actual.nombre_usuario} 👑")
         print("="*50)
         print("1. Gestionar Películas")
         print("2. Gestionar Asientos")
@@ -60,8 +70,12 @@ class UserInterface:
     def ver_estadisticas(self):
         """Ver estadísticas y exportar a CSV"""
         limpiar_terminal()
-        conexion = sqlite3.connect('cine.db')  
-        cursor = conexion.cursor()
+        reportes = {
+            "1": ("generos", "generos_mas_vistos.csv", ["Genero", "Cantidad de vistas"]),
+            "2": ("peliculas", "peliculas_mas_vistas.csv", ["Película", "Cantidad de vistas"]),
+            "3": ("horarios", "horarios_mas_concurridos.csv", ["Hora", "Cantidad de entradas"]),
+            "4": ("recaudacion", "recaudacion_por_pelicula.csv", ["Película", "Recaudación"])
+        }
 
         while True:
             print("\n=== ESTADÍSTICAS ===")
@@ -69,68 +83,59 @@ class UserInterface:
             print("2. Películas más vistas")
             print("3. Horarios más concurridos")
             print("4. Recaudación por película")
-            print("5. Volver")
+            print("5. Verificar y reconstruir estadísticas")
+            print("6. Exportar detalle de entradas vendidas")
+            print("7. Exportar todas las boletas")
+            print("8. Exportar todos los reportes en una pasada")
+            print("9. Volver")
 
             opcion = input("Selecciona una opción: ")
 
-            if opcion == "1":
-                consulta = """
-                    SELECT G.nombreGenero, COUNT(*) as vistas
-                    FROM Entrada E
-                    JOIN Horario H ON E.idHorario = H.idHorario
-                    JOIN Pelicula P ON H.idPelicula = P.idPelicula
-                    JOIN Genero G ON P.idGenero = G.idGenero
-                    GROUP BY G.nombreGenero
-                    ORDER BY vistas DESC;
-                """
-                cursor.execute(consulta)
-                resultados = cursor.fetchall()
-                self.exportar_csv("generos_mas_vistos.csv", ["Genero", "Cantidad de vistas"], resultados)
-
-            elif opcion == "2":
-                consulta = """
-                    SELECT P.titulo, COUNT(*) as vistas
-                    FROM Entrada E
-                    JOIN Horario H ON E.idHorario = H.idHorario
-                    JOIN Pelicula P ON H.idPelicula = P.idPelicula
-                    GROUP BY P.titulo
-                    ORDER BY vistas DESC;
-                """
-                cursor.execute(consulta)
-                resultados = cursor.fetchall()
-                self.exportar_csv("peliculas_mas_vistas.csv", ["Película", "Cantidad de vistas"], resultados)
-
-            elif opcion == "3":
-                consulta = """
-                    SELECT H.hora, COUNT(*) as cantidad
-                    FROM Entrada E
-                    JOIN Horario H ON E.idHorario = H.idHorario
-                    GROUP BY H.hora
-                    ORDER BY cantidad DESC;
-                """
-                cursor.execute(consulta)
-                resultados = cursor.fetchall()
-                self.exportar_csv("horarios_mas_concurridos.csv", ["Hora", "Cantidad de entradas"], resultados)
-
-            elif opcion == "4":
-                consulta = """
-                    SELECT P.titulo, SUM(E.precio) as recaudacion
-                    FROM Entrada E
-                    JOIN Horario H ON E.idHorario = H.idHorario
-                    JOIN Pelicula P ON H.idPelicula = P.idPelicula
-                    GROUP BY P.titulo
-                    ORDER BY recaudacion DESC;
-                """
-                cursor.execute(consulta)
-                resultados = cursor.fetchall()
-                self.exportar_csv("recaudacion_por_pelicula.csv", ["Película", "Recaudación"], resultados)
+            if opcion in reportes:
+                reporte, nombre_archivo, encabezados = reportes[opcion]
+                resultados = self.cinema_services.obtener_estadistica(reporte)
+                self.exportar_csv(nombre_archivo, encabezados, resultados)
 
             elif opcion == "5":
+                diferencias = self.cinema_services.reconstruir_estadisticas()
+                if diferencias is None:
+                    print("❌ Error al reconstruir las estadísticas")
+                    continue
+                for reporte, resultado in diferencias.items():
+                    if resultado['consistente']:
+                        print(f"✅ {reporte}: coincide con el recálculo completo")
+                    else:
+                        print(f"⚠️ {reporte}: {len(resultado['sobrantes'])} filas sobrantes, "
+                              f"{len(resultado['faltantes'])} faltantes (corregido)")
+
+            elif opcion in ("6", "7"):
+                comprimir = input("¿Comprimir con gzip? (s/n): ").strip().lower() == 's'
+                if opcion == "6":
+                    self.exportar_csv(
+                        "entradas_vendidas.csv",
+                        ["Entrada", "Boleta", "Fecha", "Hora", "Película", "Sala", "Asiento", "Cliente", "Precio"],
+                        self.cinema_services.iterar_libro_entradas(),
+                        comprimir
+                    )
+                else:
+                    self.exportar_csv(
+                        "boletas.csv",
+                        ["Boleta", "Fecha de compra", "Método de pago", "Total", "Entradas"],
+                        self.cinema_services.iterar_boletas(),
+                        comprimir
+                    )
+
+            elif opcion == "8":
+                inicio = time.perf_counter()
+                todos = self.cinema_services.calcular_estadisticas()
+                for reporte, nombre_archivo, encabezados in reportes.values():
+                    self.exportar_csv(nombre_archivo, encabezados, todos[reporte])
+                print(f"✅ {len(reportes)} reportes generados en {time.perf_counter() - inicio:.2f} s")
+
+            elif opcion == "9":
                 break
             else:
                 print("❌ Opción inválida")
-
-        conexion.close()
     
     def gestionar_peliculas(self):
         """Gestionar películas"""
@@ -192,7 +197,8 @@ class UserInterface:
     
     def ver_peliculas(self):
         """Ver lista de películas"""
-        peliculas = self.cinema_services.obtener_peliculas()
+        paginas = self.cinema_services.iterar_peliculas()
+        peliculas = next(paginas, [])
         
         if not peliculas:
             print("No hay películas registradas")
@@ -204,7 +210,7 @@ class UserInterface:
         print(f"{'ID':<4} {'TÍTULO':<30} {'DURACIÓN':<10} {'PRECIO EN CLP':<15} {'GÉNERO':<15} {'AUDIENCIA':<15}")
         print("-"*80)
         
-        for pelicula in peliculas:
+        for pelicula in self.paginar(peliculas, paginas):
             print(f"{pelicula[0]:<4} {pelicula[1]:<30} {pelicula[2]:<10} {pelicula[3]:<15} {pelicula[4]:<15} {pelicula[5]:<15}")
     
     def gestionar_asientos(self):
@@ -216,7 +222,8 @@ class UserInterface:
             print("="*50)
             print("1. Ver asientos por sala")
             print("2. Eliminar asiento")
-            print("3. Volver")
+            print("3. Generar distribución de asientos")
+            print("4. Volver")
             print("-"*50)
             
             opcion = input("Selecciona una opción: ")
@@ -226,6 +233,8 @@ class UserInterface:
             elif opcion == "2":
                 self.eliminar_asiento()
             elif opcion == "3":
+                self.generar_distribucion_asientos()
+            elif opcion == "4":
                 break
             else:
                 print("❌ Opción inválida")
@@ -279,6 +288,27 @@ class UserInterface:
         except ValueError:
             print("❌ Por favor ingresa un ID válido")
     
+    def generar_distribucion_asientos(self):
+        """Generar la grilla de asientos de una sala"""
+        limpiar_terminal()
+        salas = self.cinema_services.obtener_salas()
+        
+        print("\nSalas disponibles:")
+        for sala in salas:
+            print(f"{sala[0]}. {sala[1]} (Capacidad: {sala[2]})")
+        
+        try:
+            id_sala = int(input("\nSelecciona una sala (ID): "))
+            filas = int(input("Cantidad de filas: "))
+            columnas = int(input("Asientos por fila: "))
+        except ValueError:
+            print("❌ Por favor ingresa valores válidos")
+            return
+        reemplazar = input("¿Eliminar los asientos que queden fuera de la grilla? (s/n): ").strip().lower() == 's'
+        
+        creados, mensaje = self.cinema_services.generar_distribucion_asientos(id_sala, filas, columnas, reemplazar)
+        print(f"{'❌' if creados is None else '✅'} {mensaje}")
+    
     def gestionar_horarios(self):
         """Gestionar horarios"""
         limpiar_terminal()
@@ -289,7 +319,9 @@ class UserInterface:
             print("1. Agregar horario")
             print("2. Ver horarios")
             print("3. Eliminar horario")
-            print("4. Volver")
+            print("4. Importar horarios desde CSV")
+            print("5. Generar programación automática")
+            print("6. Volver")
             print("-"*50)
             
             opcion = input("Selecciona una opción: ")
@@ -301,6 +333,10 @@ class UserInterface:
             elif opcion == "3":
                 self.eliminar_horario()
             elif opcion == "4":
+                self.importar_horarios()
+            elif opcion == "5":
+                self.generar_programacion()
+            elif opcion == "6":
                 break
             else:
                 print("❌ Opción inválida")
@@ -310,7 +346,8 @@ class UserInterface:
         limpiar_terminal()
         print("\n=== AGREGAR HORARIO ===")
 
-        horarios = self.cinema_services.obtener_horarios()
+        paginas = self.cinema_services.iterar_horarios()
+        horarios = next(paginas, [])
         
         if not horarios:
             print("No hay horarios registrados")
@@ -322,7 +359,7 @@ class UserInterface:
         print(f"{'ID':<4} {'PELÍCULA':<30} {'SALA':<10} {'FECHA':<12} {'HORA':<8}")
         print("-"*100)
         
-        for horario in horarios:
+        for horario in self.paginar(horarios, paginas):
             print(f"{horario[0]:<4} {horario[1]:<30} {horario[2]:<10} {horario[3]:<12} {horario[4]:<8}")
         
         # Mostrar películas
@@ -346,13 +383,63 @@ class UserInterface:
             if resultado:
                 print("✅ Horario agregado exitosamente")
             else:
-                print("❌ Error al agregar el horario")
+                print("❌ No se pudo agregar el horario: la sala está ocupada en ese horario o los datos no son válidos")
+        except ValueError:
+            print("❌ Por favor ingresa valores válidos")
+    
+    def importar_horarios(self):
+        """Importar horarios desde un archivo CSV"""
+        limpiar_terminal()
+        print("\n=== IMPORTAR HORARIOS ===")
+        print("Columnas del archivo: idPelicula, idSala, fecha (YYYY-MM-DD), hora (HH:MM)")
+        nombre_archivo = input("Archivo CSV: ").strip()
+        
+        inicio = time.perf_counter()
+        try:
+            resultados, mensaje = self.cinema_services.importar_horarios(leer_filas(nombre_archivo))
+        except OSError as e:
+            print(f"❌ No se pudo leer el archivo: {e}")
+            return
+        except UnicodeDecodeError:
+            print("❌ El archivo no está en UTF-8: guárdalo como 'CSV UTF-8' e inténtalo de nuevo")
+            return
+        except csv.Error as e:
+            print(f"❌ El archivo no es un CSV válido: {e}")
+            return
+        segundos = time.perf_counter() - inicio
+        
+        rechazados = [r for r in resultados if r['id_horario'] is None]
+        print(f"\n{'✅' if not rechazados else '⚠️'} {mensaje} ({segundos:.2f} s)")
+        for resultado in rechazados[:20]:
+            print(f"   Fila {resultado['fila']}: {resultado['mensaje']}")
+        if len(rechazados) > 20:
+            print(f"   ... y {len(rechazados) - 20} filas rechazadas más")
+    
+    def generar_programacion(self):
+        """Generar la programación de todas las salas para varios días"""
+        limpiar_terminal()
+        print("\n=== PROGRAMACIÓN AUTOMÁTICA ===")
+        fecha_inicio = input("Fecha de inicio (YYYY-MM-DD): ").strip()
+        dias = input("Cantidad de días [7]: ").strip() or "7"
+        apertura = input("Hora de apertura (HH:MM) [10:00]: ").strip() or "10:00"
+        cierre = input("Hora de cierre (HH:MM) [23:00]: ").strip() or "23:00"
+        
+        inicio = time.perf_counter()
+        try:
+            resultados, mensaje = self.cinema_services.generar_programacion(
+                fecha_inicio, int(dias), apertura, cierre
+            )
         except ValueError:
             print("❌ Por favor ingresa valores válidos")
+            return
+        
+        rechazados = [r for r in resultados if r['id_horario'] is None]
+        print(f"\n{'✅' if not rechazados else '⚠️'} {mensaje} ({time.perf_counter() - inicio:.2f} s)")
     
     def ver_horarios(self):
         """Ver todos los horarios"""
-        horarios = self.cinema_services.obtener_horarios()
+        paginas = self.cinema_services.iterar_horarios()
+        horarios = next(paginas, [])
         
         if not horarios:
             print("No hay horarios registrados")
@@ -364,7 +451,7 @@ class UserInterface:
         print(f"{'ID':<4} {'PELÍCULA':<30} {'SALA':<10} {'FECHA':<12} {'HORA':<8}")
         print("-"*100)
         
-        for horario in horarios:
+        for horario in self.paginar(horarios, paginas):
             print(f"{horario[0]:<4} {horario[1]:<30} {horario[2]:<10} {horario[3]:<12} {horario[4]:<8}")
     
     def eliminar_horario(self):
@@ -390,10 +477,10 @@ class UserInterface:
         nombre_usuario = input("Usuario: ")
         clave = input("Contraseña: ")
         
-        usuario = self.cinema_services.verificar_usuario(nombre_usuario, clave)
+        sesion = self.cinema_services.iniciar_sesion(nombre_usuario, clave)
         
-        if usuario:
-            self.usuario_actual = (usuario[0], nombre_usuario, usuario[1])
+        if sesion:
+            self.usuario_actual = sesion
             print(f"¡Bienvenido {nombre_usuario}!")
             return True
         else:
@@ -401,6 +488,11 @@ class UserInterface:
             print("❌ Usuario o contraseña incorrectos")
             return False
     
+    def cerrar_sesion(self):
+        """Invalidar el token de la sesión actual"""
+        self.cinema_services.cerrar_sesion(self.usuario_actual.token)
+        self.usuario_actual = None
+    
     def mostrar_cartelera(self):
         """Mostrar películas y horarios"""
         limpiar_terminal()
@@ -408,7 +500,8 @@ class UserInterface:
         print("🎭 CARTELERA 🎭")
         print("="*80)
         
-        peliculas = self.cinema_services.ver_peliculas_horarios()
+        paginas = self.cinema_services.iterar_peliculas_horarios()
+        peliculas = next(paginas, [])
         
         if not peliculas:
             print("No hay películas disponibles")
@@ -417,7 +510,7 @@ class UserInterface:
         print(f"{'ID':<4} {'PELÍCULA':<20} {'FECHA':<12} {'HORA':<8} {'SALA':<10} {'PRECIO (CLP)':<10}")
         print("-"*80)
         
-        for pelicula in peliculas:
+        for pelicula in self.paginar(peliculas, paginas):
             print(f"{pelicula[0]:<4} {pelicula[1]:<20} {pelicula[2]:<12} {pelicula[3]:<8} {pelicula[4]:<10} {pelicula[5]:<10}")
     
     def seleccionar_asientos(self):
@@ -428,75 +521,44 @@ class UserInterface:
         try:
             id_horario = int(input("\nIngresa el ID de la función: "))
             
-            # Verificar que el horario existe
-            info_horario = self.cinema_services.obtener_info_horario(id_horario)
-            if not info_horario:
+            # Título, fecha, sala, película y precio se leen una sola vez para toda la compra
+            contexto = self.cinema_services.obtener_contexto_funcion(id_horario)
+            if not contexto:
                 print("❌ Horario no encontrado")
                 return
             
-            try:
-                pelicula_titulo = info_horario[0] if len(info_horario) > 0 else "Película"
-                fecha = info_horario[1] if len(info_horario) > 1 else "Fecha"
-                hora = info_horario[2] if len(info_horario) > 2 else "Hora"
-                sala = info_horario[3] if len(info_horario) > 3 else "Sala"
-
-                print(f"\n🎬 {pelicula_titulo} - {fecha} {hora} - {sala}")
-                
-                if len(info_horario) > 4:
-                    id_pelicula = info_horario[4]
-                else:
-                    id_pelicula = self.cinema_services.obtener_id_pelicula_por_titulo(pelicula_titulo)
-                    
-            except Exception as e:
-                print(f"❌ Error al procesar información del horario: {e}")
-                return
-            
-            precio = self.cinema_services.obtener_precio_pelicula(id_pelicula)
-            if precio is None:
+            if contexto.precio is None:
                 print("❌ No se pudo obtener el precio de la película")
                 return
             
-            # ✅ Ahora simplemente llamamos a procesar la compra múltiple
-            self.procesar_compra(id_horario, precio)
+            self.procesar_compra(contexto)
             
         except ValueError:
             print("❌ Por favor ingresa números válidos")
         except Exception as e:
             print(f"❌ Error: {e}")
 
-    def procesar_compra(self, id_horario, precio_unitario):
+    def procesar_compra(self, contexto):
         """Procesar la compra de múltiples entradas en una sola boleta"""
-        id_entradas = []
+        id_horario = contexto.id_horario
+        precio_unitario = contexto.precio
+        id_asientos = []
+        # Los asientos elegidos quedan reservados para esta compra hasta pagar o salir
+        sesion = uuid.uuid4().hex
         
         while True:
             limpiar_terminal()
+            print(f"\n🎬 {contexto.titulo} - {contexto.fecha} {contexto.hora} - {contexto.sala}")
 
-            info_horario = self.cinema_services.obtener_info_horario(id_horario)
-            if not info_horario:
-                print("❌ Horario no encontrado")
-                return
-                
-            try:
-                pelicula_titulo = info_horario[0] if len(info_horario) > 0 else "Película"
-                fecha = info_horario[1] if len(info_horario) > 1 else "Fecha"
-                hora = info_horario[2] if len(info_horario) > 2 else "Hora"
-                sala = info_horario[3] if len(info_horario) > 3 else "Sala"
-
-                print(f"\n🎬 {pelicula_titulo} - {fecha} {hora} - {sala}")
-                
-                if len(info_horario) > 4:
-                    id_pelicula = info_horario[4]
-                else:
-                    id_pelicula = self.cinema_services.obtener_id_pelicula_por_titulo(pelicula_titulo)
-                        
-            except Exception as e:
-                print(f"❌ Error al procesar información del horario: {e}")
-                return
-
-            asientos = self.cinema_services.obtener_asientos_compra(id_horario)
+            asientos = [
+                asiento for asiento in self.cinema_services.obtener_asientos_compra(id_horario, sesion)
+                if asiento[0] not in id_asientos
+            ]
             if not asientos:
                 print("❌ No hay asientos disponibles para esta función")
-                return
+                if not id_asientos:
+                    return
+                break
 
             print("\n🪑 ASIENTOS DISPONIBLES:")
             print(f"{'ID':<4} {'ASIENTO':<8} {'SALA':<10}")
@@ -511,24 +573,36 @@ class UserInterface:
                 print("❌ ID de asiento inválido")
                 continue
 
-            id_entrada, mensaje = self.cinema_services.comprar_entrada(
-                id_horario, self.usuario_actual[0], id_asiento, precio_unitario
-            )
-
-            if not id_entrada:
-                print(f"❌ {mensaje}")
+            reservados, _ = self.cinema_services.reservar_asientos(sesion, id_horario, [id_asiento])
+            if not reservados:
+                print("❌ El asiento no está disponible")
             else:
-                print(f"✅ {mensaje}")
-                id_entradas.append(id_entrada)
+                print("✅ Asiento reservado para tu compra")
+                id_asientos.append(id_asiento)
 
             seguir = input("➕ ¿Deseas comprar otro asiento para esta función? (s/n): ").strip().lower()
             if seguir != 's':
                 break
 
-        if not id_entradas:
+        if not id_asientos:
             print("❌ No se realizó ninguna compra.")
             return
 
+        # Comprar todos los asientos elegidos en una sola transacción
+        resultados, mensaje = self.cinema_services.comprar_entradas(
+            id_horario, self.usuario_actual.id_usuario, id_asientos, precio_unitario, sesion
+        )
+        id_entradas = [resultado['id_entrada'] for resultado in resultados if resultado['id_entrada']]
+
+        if len(id_entradas) != len(id_asientos):
+            self.cinema_services.liberar_reservas(sesion)
+            print(f"❌ {mensaje}")
+            for resultado in resultados:
+                print(f"   Asiento {resultado['asiento']}: {resultado['mensaje']}")
+            return
+
+        print(f"✅ {mensaje}")
+
         # Mostrar métodos de pago
         print("\n💳 MÉTODOS DE PAGO:")
         metodos_pago = self.cinema_services.obtener_metodos_pago()
@@ -544,15 +618,10 @@ class UserInterface:
                 print("❌ Método de pago no válido")
                 return
 
-            # Crear boleta sin entrada (total = suma de todos los precios)
-            total = len(id_entradas) * precio_unitario
-            id_boleta, mensaje_boleta = self.cinema_services.crear_boleta_sin_entrada(id_metodo_pago, total)
+            # Crear la boleta con todas sus entradas (el total lo calcula el servicio)
+            id_boleta, mensaje_boleta = self.cinema_services.checkout(id_entradas, id_metodo_pago)
 
             if id_boleta:
-                # Asociar todas las entradas a la boleta
-                for id_entrada in id_entradas:
-                    self.cinema_services.insertar_boleta_entrada(id_boleta, id_entrada)
-
                 print(f"✅ {mensaje_boleta}")
                 print(f"🎫 Número de boleta: {id_boleta}")
 
@@ -568,8 +637,8 @@ class UserInterface:
         """Mostrar información completa de una boleta con múltiples entradas"""
         limpiar_terminal()
 
-        boleta_info = self.cinema_services.ver_boleta_completa(id_boleta)
-        entradas = self.cinema_services.ver_entradas_de_boleta(id_boleta)
+        boleta_info = self.cinema_services.obtener_boleta(id_boleta)
+        entradas = boleta_info['entradas'] if boleta_info else []
 
         if not boleta_info or not entradas:
             print("❌ Boleta o entradas no encontradas")
@@ -597,15 +666,37 @@ class UserInterface:
         """Ver boletas del usuario actual"""
         limpiar_terminal()
         print("\n=== MIS BOLETAS ===")
-        id_boleta = input("Ingresa el número de boleta (o 'q' para volver): ")
+        
+        paginas = self.cinema_services.iterar_boletas_usuario(self.usuario_actual.id_usuario)
+        boletas = next(paginas, [])
+        
+        if not boletas:
+            print("Todavía no tienes boletas")
+            return
+        
+        print(f"{'BOLETA':<8} {'FECHA DE COMPRA':<20} {'MÉTODO DE PAGO':<18} {'ENTRADAS':<9} {'TOTAL':<10}")
+        print("-"*70)
+        
+        propias = set()
+        for boleta in self.paginar(boletas, paginas):
+            propias.add(boleta[0])
+            print(f"{boleta[0]:<8} {boleta[1] or '':<20} {boleta[2] or '':<18} {boleta[4]:<9} ${boleta[3]:<10}")
+        
+        id_boleta = input("\nIngresa el número de boleta para verla (o 'q' para volver): ")
         
         if id_boleta.lower() == 'q':
             return
         
         try:
-            self.mostrar_boleta(int(id_boleta))
+            id_boleta = int(id_boleta)
         except ValueError:
             print("❌ Número de boleta inválido")
+            return
+        
+        if id_boleta not in propias:
+            print("❌ La boleta no está en tu historial")
+            return
+        self.mostrar_boleta(id_boleta)
     
     def ejecutar(self):    
         while True:
@@ -624,9 +715,14 @@ class UserInterface:
                 else:
                     print("❌ Opción inválida")
             
+            elif not self.cinema_services.autorizar(self.usuario_actual.token):
+                limpiar_terminal()
+                print("⌛ Tu sesión expiró por inactividad, vuelve a iniciar sesión")
+                self.usuario_actual = None
+            
             else:
                 # Usuario logueado
-                if self.usuario_actual[2] == 'Administrador':
+                if self.usuario_actual.tipo_usuario == 'Administrador':
                     self.mostrar_menu_administrador()
                     opcion = input("Selecciona una opción: ")
                     
@@ -647,8 +743,8 @@ class UserInterface:
                         input("\nPresiona Enter para continuar...")    
                     elif opcion == "0":
                         limpiar_terminal()
-                        print(f"¡Hasta luego {self.usuario_actual[1]}! 👋")
-                        self.usuario_actual = None
+                        print(f"¡Hasta luego {self.usuario_actual.nombre_usuario}! 👋")
+                        self.cerrar_sesion()
                     else:
                         print("❌ Opción inválida")
                 else:
@@ -666,7 +762,7 @@ class UserInterface:
                         input("\nPresiona Enter para continuar...")
                     elif opcion == "0":
                         limpiar_terminal()
-                        print(f"¡Hasta luego {self.usuario_actual[1]}! 👋")
-                        self.usuario_actual = None
+                        print(f"¡Hasta luego {self.usuario_actual.nombre_usuario}! 👋")
+                        self.cerrar_sesion()
                     else:
                         print("❌ Opción inválida")
\ No newline at end of file
@@ -10,6 +10,7 @@ Estructura del proyecto:
 - database_manager.py: Gestión de la base de datos
 - servicios_del_cine.py: Servicios y lógica de negocio
 - interfaz_usuario.py: Interfaz de usuario
+- servidor_api.py: API HTTP/JSON para clientes web o de autoservicio (python servidor_api.py)
 
 Usuarios de prueba:
 - Cliente: usuario 'juan123', contraseña 'pass123'
@@ -44,6 +45,12 @@ def main():
             if not db_manager.verificar_conexion():
                 raise Exception("No se pudo conectar a la base de datos")
             
+            aplicadas = ", ".join(f"v{numero}" for numero, _ in db_manager.migraciones_aplicadas)
+            logging.info(
+                f"Base de datos lista en {db_manager.tiempo_inicio_ms:.1f} ms "
+                f"(esquema v{db_manager.version}, migraciones aplicadas: {aplicadas or 'ninguna'})"
+            )
+            
             cinema_services = CinemaServices(db_manager)
             if not cinema_services:
                 raise Exception("Error al inicializar los servicios del cine")
@@ -0,0 +1,204 @@
+import bisect
+import threading
+from datetime import date, timedelta
+
+def _partes_hora(hora):
+    horas, minutos = (int(parte) for parte in hora.split(":"))
+    if not (0 <= horas < 24 and 0 <= minutos < 60):
+        raise ValueError(f"Hora inválida: {hora}")
+    return horas, minutos
+
+
+def normalizar_fecha_hora(fecha, hora):
+    """Validar fecha y hora y devolverlas como YYYY-MM-DD y HH:MM"""
+    horas, minutos = _partes_hora(str(hora).strip())
+    return date.fromisoformat(str(fecha).strip()).isoformat(), f"{horas:02d}:{minutos:02d}"
+
+
+def minuto_absoluto(fecha, hora):
+    """Convertir fecha (YYYY-MM-DD) y hora (HH:MM) en minutos desde una fecha de origen fija"""
+    horas, minutos = _partes_hora(hora)
+    return date.fromisoformat(fecha).toordinal() * 1440 + horas * 60 + minutos
+
+
+def fecha_hora_de_minuto(minuto):
+    """Operación inversa de minuto_absoluto"""
+    dia, minuto_del_dia = divmod(minuto, 1440)
+    return date.fromordinal(dia).isoformat(), f"{minuto_del_dia // 60:02d}:{minuto_del_dia % 60:02d}"
+
+
+class RoomOccupancyIndex:
+    """Intervalos de proyección ordenados por inicio en cada sala, para detectar solapamientos"""
+    
+    def __init__(self, db_manager, limpieza=0):
+        self.db_manager = db_manager
+        # Minutos de limpieza que deben quedar libres entre dos funciones de la misma sala
+        self.limpieza = limpieza
+        self._lock = threading.RLock()
+        # idSala -> [inicios, fines, ids] en listas paralelas ordenadas por inicio, y la duración máxima
+        self._salas = {}
+        # idHorario -> (idSala, inicio), para quitar una función sin recorrer su sala
+        self._horarios = {}
+    
+    def _intervalos(self, filas):
+        """Convertir filas (idHorario, fecha, hora, duración) en intervalos (inicio, fin, idHorario) ordenados"""
+        intervalos = []
+        for id_horario, fecha, hora, duracion in filas:
+            try:
+                inicio = minuto_absoluto(fecha, hora)
+            except (TypeError, ValueError):
+                # Horarios con fecha u hora mal formadas no pueden ubicarse en el tiempo
+                continue
+            intervalos.append((inicio, inicio + max(duracion or 0, 1), id_horario))
+        intervalos.sort()
+        return intervalos
+    
+    def _cargar_sala(self, id_sala):
+        """Leer las funciones de una sala con la duración de su película"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT H.idHorario, H.fecha, H.hora, P.duracion
+                FROM Horario H
+                JOIN Pelicula P ON H.idPelicula = P.idPelicula
+                WHERE H.idSala = ?
+            """, (id_sala,))
+            filas = cursor.fetchall()
+        
+        intervalos = self._intervalos(filas)
+        sala = {
+            'inicios': [intervalo[0] for intervalo in intervalos],
+            'fines': [intervalo[1] for intervalo in intervalos],
+            'ids': [intervalo[2] for intervalo in intervalos],
+            'duracion_maxima': max((fin - inicio for inicio, fin, _ in intervalos), default=0)
+        }
+        self._salas[id_sala] = sala
+        for inicio, _, id_horario in intervalos:
+            self._horarios[id_horario] = (id_sala, inicio)
+        return sala
+    
+    def _sala(self, id_sala):
+        return self._salas.get(id_sala) or self._cargar_sala(id_sala)
+    
+    def _solapadas(self, sala, inicio, fin, limpieza):
+        """Posiciones de las funciones de la sala que se solapan con [inicio, fin) más la limpieza"""
+        inicios, fines = sala['inicios'], sala['fines']
+        # Solo pueden solaparse las funciones que empiezan antes del fin (más la limpieza)
+        # y después del inicio menos la función más larga de la sala
+        hasta = bisect.bisect_left(inicios, fin + limpieza)
+        desde = bisect.bisect_right(inicios, inicio - limpieza - sala['duracion_maxima'])
+        return [i for i in range(desde, hasta) if fines[i] + limpieza > inicio]
+    
+    def conflictos(self, id_sala, fecha, hora, duracion, limpieza=None, ignorar=None):
+        """IDs de las funciones de la sala que se solapan con la indicada, incluida la limpieza"""
+        limpieza = self.limpieza if limpieza is None else limpieza
+        inicio = minuto_absoluto(fecha, hora)
+        
+        with self._lock:
+            sala = self._sala(id_sala)
+            posiciones = self._solapadas(sala, inicio, inicio + max(duracion, 1), limpieza)
+            return [sala['ids'][i] for i in posiciones if sala['ids'][i] != ignorar]
+    
+    def ocupado_hasta(self, id_sala, inicio, duracion, limpieza=None):
+        """Minuto absoluto en que la sala queda libre para una función que empezaría en inicio (None si ya lo está)"""
+        limpieza = self.limpieza if limpieza is None else limpieza
+        with self._lock:
+            sala = self._sala(id_sala)
+            posiciones = self._solapadas(sala, inicio, inicio + max(duracion, 1), limpieza)
+            if not posiciones:
+                return None
+            return max(sala['fines'][i] for i in posiciones) + limpieza
+    
+    def esta_libre(self, id_sala, fecha, hora, duracion, limpieza=None):
+        """Indicar si la sala puede recibir una función sin solaparse con otra"""
+        return not self.conflictos(id_sala, fecha, hora, duracion, limpieza)
+    
+    def agregar(self, id_horario, id_sala, fecha, hora, duracion):
+        """Registrar una función recién programada"""
+        inicio = minuto_absoluto(fecha, hora)
+        fin = inicio + max(duracion, 1)
+        with self._lock:
+            sala = self._sala(id_sala)
+            if id_horario in self._horarios:
+                return
+            posicion = bisect.bisect_right(sala['inicios'], inicio)
+            sala['inicios'].insert(posicion, inicio)
+            sala['fines'].insert(posicion, fin)
+            sala['ids'].insert(posicion, id_horario)
+            sala['duracion_maxima'] = max(sala['duracion_maxima'], fin - inicio)
+            self._horarios[id_horario] = (id_sala, inicio)
+    
+    def quitar(self, id_horario):
+        """Olvidar una función eliminada"""
+        with self._lock:
+            ubicacion = self._horarios.pop(id_horario, None)
+            if ubicacion is None:
+                return
+            id_sala, inicio = ubicacion
+            sala = self._salas[id_sala]
+            posicion = bisect.bisect_left(sala['inicios'], inicio)
+            while sala['ids'][posicion] != id_horario:
+                posicion += 1
+            del sala['inicios'][posicion]
+            del sala['fines'][posicion]
+            del sala['ids'][posicion]
+    
+    def refrescar(self, cursor, id_sala, fecha_desde, fecha_hasta=None):
+        """Releer de la base las funciones de la sala que pueden solaparse con las fechas indicadas"""
+        # Otros procesos pueden haber programado la sala: las escrituras lo llaman con el cursor de su transacción
+        fecha_desde = date.fromisoformat(fecha_desde)
+        fecha_hasta = date.fromisoformat(fecha_hasta) if fecha_hasta else fecha_desde
+        # Días que puede abarcar la función más larga, más su limpieza, hacia cada lado
+        cursor.execute("SELECT COALESCE(MAX(duracion), 0) FROM Pelicula")
+        margen = timedelta(days=1 + (cursor.fetchone()[0] + self.limpieza) // 1440)
+        desde, hasta = fecha_desde - margen, fecha_hasta + margen
+        cursor.execute("""
+            SELECT H.idHorario, H.fecha, H.hora, P.duracion
+            FROM Horario H
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            WHERE H.idSala = ? AND H.fecha BETWEEN ? AND ?
+        """, (id_sala, desde.isoformat(), hasta.isoformat()))
+        inicio_rango = desde.toordinal() * 1440
+        fin_rango = (hasta.toordinal() + 1) * 1440
+        intervalos = [
+            intervalo for intervalo in self._intervalos(cursor.fetchall())
+            if inicio_rango <= intervalo[0] < fin_rango
+        ]
+        with self._lock:
+            sala = self._sala(id_sala)
+            # Las funciones leídas reemplazan a las que el índice tenía en el mismo rango
+            for id_horario in [id_horario for _, _, id_horario in intervalos if id_horario in self._horarios]:
+                self.quitar(id_horario)
+            desde_pos = bisect.bisect_left(sala['inicios'], inicio_rango)
+            hasta_pos = bisect.bisect_left(sala['inicios'], fin_rango)
+            for id_horario in sala['ids'][desde_pos:hasta_pos]:
+                self._horarios.pop(id_horario, None)
+            sala['inicios'][desde_pos:hasta_pos] = [intervalo[0] for intervalo in intervalos]
+            sala['fines'][desde_pos:hasta_pos] = [intervalo[1] for intervalo in intervalos]
+            sala['ids'][desde_pos:hasta_pos] = [intervalo[2] for intervalo in intervalos]
+            for inicio, fin, id_horario in intervalos:
+                self._horarios[id_horario] = (id_sala, inicio)
+                sala['duracion_maxima'] = max(sala['duracion_maxima'], fin - inicio)
+    
+    def invalidar_sala(self, id_sala):
+        """Descartar una sala para que se vuelva a leer en el próximo uso"""
+        with self._lock:
+            sala = self._salas.pop(id_sala, None)
+            if sala:
+                for id_horario in sala['ids']:
+                    self._horarios.pop(id_horario, None)
+    
+    def limpiar(self):
+        """Vaciar el índice completo"""
+        with self._lock:
+            self._salas.clear()
+            self._horarios.clear()
+    
+    def estadisticas(self):
+        """Obtener el tamaño del índice"""
+        with self._lock:
+            return {
+                'salas': len(self._salas),
+                'funciones': len(self._horarios),
+                'limpieza': self.limpieza
+            }
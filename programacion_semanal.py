@@ -0,0 +1,54 @@
+from datetime import date
+from ocupacion_salas import minuto_absoluto, fecha_hora_de_minuto
+
+def planificar(peliculas, salas, fecha_inicio, dias=7, apertura="10:00", cierre="23:00",
+               limpieza=0, paso=5, ocupado_hasta=None):
+    """Llenar cada sala y día con funciones consecutivas; devuelve filas (idPelicula, idSala, fecha, hora)"""
+    # peliculas: [(idPelicula, duración en minutos)]
+    # ocupado_hasta(id_sala, inicio, duracion): minuto en que la sala queda libre de funciones ya programadas
+    # Una película sin duración positiva no haría avanzar la jornada
+    peliculas = [(id_pelicula, duracion) for id_pelicula, duracion in peliculas if duracion and duracion > 0]
+    if not peliculas or not salas:
+        return []
+    
+    primer_dia = date.fromisoformat(fecha_inicio).toordinal() * 1440
+    inicio_jornada = minuto_absoluto(fecha_inicio, apertura) - primer_dia
+    fin_jornada = minuto_absoluto(fecha_inicio, cierre) - primer_dia
+    if fin_jornada <= inicio_jornada:
+        # El cierre es pasada la medianoche
+        fin_jornada += 1440
+    
+    filas = []
+    for numero_sala, id_sala in enumerate(salas):
+        for dia in range(dias):
+            minuto = primer_dia + dia * 1440 + inicio_jornada
+            cierre_dia = primer_dia + dia * 1440 + fin_jornada
+            # Cada sala y día empiezan la rotación en una película distinta para repartir la cartelera
+            turno = (numero_sala + dia) % len(peliculas)
+            
+            while minuto < cierre_dia:
+                minuto = -(-minuto // paso) * paso
+                colocada = False
+                libre_desde = None
+                # Voraz: la primera película de la rotación que entra completa antes del cierre
+                for desplazamiento in range(len(peliculas)):
+                    id_pelicula, duracion = peliculas[(turno + desplazamiento) % len(peliculas)]
+                    if minuto + duracion > cierre_dia:
+                        continue
+                    bloqueo = ocupado_hasta(id_sala, minuto, duracion) if ocupado_hasta else None
+                    if bloqueo is not None:
+                        libre_desde = bloqueo if libre_desde is None else min(libre_desde, bloqueo)
+                        continue
+                    filas.append((id_pelicula, id_sala, *fecha_hora_de_minuto(minuto)))
+                    minuto += duracion + limpieza
+                    turno = (turno + desplazamiento + 1) % len(peliculas)
+                    colocada = True
+                    break
+                
+                if not colocada:
+                    if libre_desde is None:
+                        # Ninguna película entra en lo que queda de la jornada
+                        break
+                    # La sala está tomada por una función existente: seguir cuando termine
+                    minuto = libre_desde
+    return filas
@@ -0,0 +1,100 @@
+import heapq
+import threading
+import time
+
+class SeatHoldManager:
+    """Reservas temporales de asientos por sesión, con vencimiento mediante un heap"""
+    
+    def __init__(self, ttl=300, reloj=time.monotonic):
+        self.ttl = ttl
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        # (idHorario, idAsiento) -> (sesión, instante de vencimiento)
+        self._reservas = {}
+        # idHorario -> {idAsiento: sesión}, para excluir asientos de los listados
+        self._por_horario = {}
+        # Heap de (vencimiento, idHorario, idAsiento, sesión); las entradas obsoletas se descartan al salir
+        self._vencimientos = []
+        
+        self.expiradas = 0
+        self.conflictos = 0
+    
+    def _expirar(self):
+        """Quitar las reservas vencidas; solo se revisa la cima del heap"""
+        ahora = self._reloj()
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            vence, id_horario, id_asiento, sesion = heapq.heappop(self._vencimientos)
+            actual = self._reservas.get((id_horario, id_asiento))
+            # Si la reserva se renovó o cambió de sesión, esta entrada del heap ya no vale
+            if actual != (sesion, vence):
+                continue
+            self._quitar(id_horario, id_asiento)
+            self.expiradas += 1
+    
+    def _quitar(self, id_horario, id_asiento):
+        del self._reservas[(id_horario, id_asiento)]
+        asientos = self._por_horario[id_horario]
+        del asientos[id_asiento]
+        if not asientos:
+            del self._por_horario[id_horario]
+    
+    def reservar(self, sesion, id_horario, id_asientos, ttl=None):
+        """Reservar asientos para una sesión; devuelve (reservados, rechazados)"""
+        ttl = self.ttl if ttl is None else ttl
+        reservados, rechazados = [], []
+        with self._lock:
+            self._expirar()
+            vence = self._reloj() + ttl
+            for id_asiento in id_asientos:
+                actual = self._reservas.get((id_horario, id_asiento))
+                if actual and actual[0] != sesion:
+                    rechazados.append(id_asiento)
+                    self.conflictos += 1
+                    continue
+                self._reservas[(id_horario, id_asiento)] = (sesion, vence)
+                self._por_horario.setdefault(id_horario, {})[id_asiento] = sesion
+                heapq.heappush(self._vencimientos, (vence, id_horario, id_asiento, sesion))
+                reservados.append(id_asiento)
+        return reservados, rechazados
+    
+    def liberar(self, sesion, id_horario=None, id_asientos=None):
+        """Liberar reservas de una sesión, opcionalmente solo de una función o de ciertos asientos"""
+        with self._lock:
+            if id_horario is None:
+                candidatas = list(self._reservas)
+            else:
+                candidatas = [(id_horario, id_asiento) for id_asiento in self._por_horario.get(id_horario, {})]
+            claves = [
+                clave for clave in candidatas
+                if self._reservas[clave][0] == sesion
+                and (id_asientos is None or clave[1] in id_asientos)
+            ]
+            for id_h, id_asiento in claves:
+                self._quitar(id_h, id_asiento)
+            return len(claves)
+    
+    def retenidos_por_otros(self, id_horario, sesion=None):
+        """Asientos de una función reservados por sesiones distintas de la indicada"""
+        with self._lock:
+            self._expirar()
+            asientos = self._por_horario.get(id_horario, {})
+            return {id_asiento for id_asiento, duena in asientos.items() if duena != sesion}
+    
+    def reservas_de(self, sesion, id_horario):
+        """Asientos que la sesión tiene reservados en una función"""
+        with self._lock:
+            self._expirar()
+            asientos = self._por_horario.get(id_horario, {})
+            return [id_asiento for id_asiento, duena in asientos.items() if duena == sesion]
+    
+    def estadisticas(self):
+        """Obtener el estado de las reservas"""
+        with self._lock:
+            self._expirar()
+            return {
+                'activas': len(self._reservas),
+                'funciones': len(self._por_horario),
+                'pendientes_heap': len(self._vencimientos),
+                'expiradas': self.expiradas,
+                'conflictos': self.conflictos
+            }
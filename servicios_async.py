@@ -0,0 +1,102 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from servicios_del_cine import CinemaServices
+
+class ServicioSaturadoError(Exception):
+    """Se superó el límite de solicitudes pendientes del servicio"""
+
+
+class AsyncCinemaServices:
+    """Fachada asyncio de CinemaServices sobre un pool acotado de hilos"""
+    
+    def __init__(self, cinema_services, hilos=8, max_pendientes=256, timeout_espera=None):
+        self.servicios = cinema_services
+        self.hilos = hilos
+        self.max_pendientes = max_pendientes
+        self.timeout_espera = timeout_espera
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="cine")
+        self._cupos = None
+        
+        # Cada hilo necesita su propia conexión
+        cinema_services.db_manager.pool.ampliar(hilos)
+        
+        self.en_curso = 0
+        self.completadas = 0
+        self.rechazadas = 0
+    
+    def _semaforo(self):
+        # Se crea al primer uso para quedar ligado al event loop que lo utiliza
+        if self._cupos is None:
+            self._cupos = asyncio.Semaphore(self.max_pendientes)
+        return self._cupos
+    
+    async def _ejecutar(self, funcion, *args, **kwargs):
+        """Ejecutar una operación bloqueante en el executor aplicando contrapresión"""
+        cupos = self._semaforo()
+        try:
+            if self.timeout_espera is None:
+                await cupos.acquire()
+            else:
+                await asyncio.wait_for(cupos.acquire(), self.timeout_espera)
+        except asyncio.TimeoutError:
+            self.rechazadas += 1
+            raise ServicioSaturadoError(
+                f"Más de {self.max_pendientes} solicitudes pendientes"
+            ) from None
+        
+        self.en_curso += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(funcion, *args, **kwargs))
+        finally:
+            self.en_curso -= 1
+            self.completadas += 1
+            cupos.release()
+    
+    def estadisticas(self):
+        """Obtener el estado de la fachada y del pool de conexiones"""
+        return {
+            'hilos': self.hilos,
+            'max_pendientes': self.max_pendientes,
+            'en_curso': self.en_curso,
+            'completadas': self.completadas,
+            'rechazadas': self.rechazadas,
+            'pool': self.servicios.db_manager.pool.estadisticas()
+        }
+    
+    def cerrar(self):
+        """Esperar las operaciones en curso y detener los hilos"""
+        self._executor.shutdown(wait=True)
+
+
+def _generador_asincrono(nombre, original):
+    @functools.wraps(original)
+    async def metodo(self, *args, **kwargs):
+        generador = getattr(self.servicios, nombre)(*args, **kwargs)
+        fin = object()
+        # Cada página se lee en el executor para no bloquear el event loop
+        while True:
+            pagina = await self._ejecutar(next, generador, fin)
+            if pagina is fin:
+                return
+            yield pagina
+    return metodo
+
+
+def _corrutina(nombre, original):
+    @functools.wraps(original)
+    async def metodo(self, *args, **kwargs):
+        return await self._ejecutar(getattr(self.servicios, nombre), *args, **kwargs)
+    return metodo
+
+
+# Exponer como corrutina cada método público de CinemaServices (los listados paginados como generadores asíncronos)
+for _nombre, _metodo in inspect.getmembers(CinemaServices, inspect.isfunction):
+    if _nombre.startswith("_"):
+        continue
+    if inspect.isgeneratorfunction(_metodo):
+        setattr(AsyncCinemaServices, _nombre, _generador_asincrono(_nombre, _metodo))
+    else:
+        setattr(AsyncCinemaServices, _nombre, _corrutina(_nombre, _metodo))
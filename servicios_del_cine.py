@@ -1,554 +1,1256 @@
 import sqlite3
-from datetime import datetime
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
 from database_manager import DatabaseManager
+from disponibilidad_asientos import SeatAvailabilityIndex
+from reservas_asientos import SeatHoldManager
+from ocupacion_salas import RoomOccupancyIndex, normalizar_fecha_hora
+from cache_referencias import ReferenceCache
+from sesiones_usuario import SessionStore
+from programacion_semanal import planificar
+
+# Reportes de ventas: (consulta sobre las tablas resumen, recálculo completo sobre Entrada)
+REPORTES_ESTADISTICAS = {
+    "generos": ("""
+        SELECT G.nombreGenero, SUM(EG.vistas) as vistas
+        FROM EstadisticaGenero EG
+        JOIN Genero G ON EG.idGenero = G.idGenero
+        WHERE EG.vistas > 0
+        GROUP BY G.nombreGenero
+        ORDER BY vistas DESC
+    """, """
+        SELECT G.nombreGenero, COUNT(*) as vistas
+        FROM Entrada E
+        JOIN Horario H ON E.idHorario = H.idHorario
+        JOIN Pelicula P ON H.idPelicula = P.idPelicula
+        JOIN Genero G ON P.idGenero = G.idGenero
+        GROUP BY G.nombreGenero
+        ORDER BY vistas DESC
+    """),
+    "peliculas": ("""
+        SELECT P.titulo, SUM(EP.vistas) as vistas
+        FROM EstadisticaPelicula EP
+        JOIN Pelicula P ON EP.idPelicula = P.idPelicula
+        WHERE EP.vistas > 0
+        GROUP BY P.titulo
+        ORDER BY vistas DESC
+    """, """
+        SELECT P.titulo, COUNT(*) as vistas
+        FROM Entrada E
+        JOIN Horario H ON E.idHorario = H.idHorario
+        JOIN Pelicula P ON H.idPelicula = P.idPelicula
+        GROUP BY P.titulo
+        ORDER BY vistas DESC
+    """),
+    "horarios": ("""
+        SELECT hora, cantidad
+        FROM EstadisticaHora
+        WHERE cantidad > 0
+        ORDER BY cantidad DESC
+    """, """
+        SELECT H.hora, COUNT(*) as cantidad
+        FROM Entrada E
+        JOIN Horario H ON E.idHorario = H.idHorario
+        WHERE H.hora IS NOT NULL
+        GROUP BY H.hora
+        ORDER BY cantidad DESC
+    """),
+    "recaudacion": ("""
+        SELECT P.titulo, SUM(EP.recaudacion) as recaudacion
+        FROM EstadisticaPelicula EP
+        JOIN Pelicula P ON EP.idPelicula = P.idPelicula
+        WHERE EP.vistas > 0
+        GROUP BY P.titulo
+        ORDER BY recaudacion DESC
+    """, """
+        SELECT P.titulo, COALESCE(SUM(E.precio), 0) as recaudacion
+        FROM Entrada E
+        JOIN Horario H ON E.idHorario = H.idHorario
+        JOIN Pelicula P ON H.idPelicula = P.idPelicula
+        GROUP BY P.titulo
+        ORDER BY recaudacion DESC
+    """)
+}
+
+# Una sola lectura de Entrada agrupada por función; los cuatro reportes se acumulan a partir de ella
+CONSULTA_ESTADISTICAS_UNA_PASADA = """
+    SELECT P.titulo, G.nombreGenero, H.hora, V.vistas, V.recaudacion
+    FROM (
+        SELECT idHorario, COUNT(*) as vistas, COALESCE(SUM(precio), 0) as recaudacion
+        FROM Entrada
+        GROUP BY idHorario
+    ) V
+    JOIN Horario H ON V.idHorario = H.idHorario
+    LEFT JOIN Pelicula P ON H.idPelicula = P.idPelicula
+    LEFT JOIN Genero G ON P.idGenero = G.idGenero
+"""
+
+# Datos de una función que necesita todo el proceso de compra, leídos de una sola vez
+ShowtimeContext = namedtuple(
+    "ShowtimeContext", ["titulo", "fecha", "hora", "sala", "id_pelicula", "precio", "id_horario", "id_sala"]
+)
+
+CAMPOS_BOLETA = ('id', 'id_usuario', 'cliente', 'metodo_pago', 'fecha_compra', 'total')
+CAMPOS_ENTRADA_BOLETA = ('pelicula', 'fecha', 'hora', 'sala', 'asiento', 'precio')
+
+def codigo_fila(indice):
+    """Letras de una fila de asientos: A..Z, AA, AB, ..."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
 
 class CinemaServices:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, ttl_reservas=300, ttl_cache=None, max_cache=256, limpieza_salas=0,
+                 max_boletas=1024, ttl_sesiones=1800, max_sesiones=10000):
         self.db_manager = db_manager
+        self.disponibilidad = SeatAvailabilityIndex(db_manager)
+        self.ocupacion = RoomOccupancyIndex(db_manager, limpieza_salas)
+        self.reservas = SeatHoldManager(ttl_reservas)
+        self.cache = ReferenceCache(max_cache, ttl_cache)
+        # Las boletas emitidas no cambian: se guardan armadas, aparte de los datos de referencia
+        self.cache_boletas = ReferenceCache(max_boletas)
+        self.sesiones = SessionStore(ttl_sesiones, max_sesiones)
+    
+        # Versión local de los datos de cartelera; cada cambio de películas u horarios la incrementa
+        self.version_cartelera = 0
+        self._cartelera = (None, None)
+        self._lock_cartelera = threading.Lock()
+    
+    def _cartelera_modificada(self):
+        """Marcar como obsoleta la cartelera precalculada"""
+        with self._lock_cartelera:
+            self.version_cartelera += 1
+    
+    def _version_cartelera(self):
+        """Versión vigente de la cartelera: la local y la de la base, que cambia con escrituras de otros procesos"""
+        version_local = self.version_cartelera
+        with self.db_manager.conexion() as conn:
+            version_base = conn.execute("SELECT version FROM VersionCartelera WHERE id = 1").fetchone()[0]
+        return version_local, version_base
     
     def ver_peliculas_horarios(self):
         """Ver películas disponibles y sus horarios"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
+        # La versión se lee antes de consultar: si cambia durante la consulta, la foto no se reutiliza
+        version = self._version_cartelera()
+        anterior, resultados = self._cartelera
+        if anterior == version:
+            return resultados
         
-        query = """
-        SELECT H.idHorario, P.titulo, H.fecha, H.hora, S.nombreSala, P.precioEntrada
-        FROM Pelicula P
-        JOIN Horario H ON P.idPelicula = H.idPelicula
-        JOIN Sala S ON H.idSala = S.idSala
-        ORDER BY H.fecha, H.hora
-        """
+        resultados = self._consultar_peliculas_horarios()
+        self._cartelera = (version, resultados)
+        return resultados
+    
+    def _paginar(self, consulta, columnas_clave, posiciones_clave, tamano_pagina,
+                 parametros=(), descendente=False, desde=None):
+        """Recorrer una consulta por páginas usando la última clave vista (keyset), opcionalmente después de `desde`"""
+        # Una clave NULL se compara como '': las columnas que lo admiten van como COALESCE(columna, '')
+        marcadores = ", ".join("?" for _ in posiciones_clave)
+        comparacion = "<" if descendente else ">"
+        filtro = f"({', '.join(columnas_clave)}) {comparacion} ({marcadores})"
+        if len(columnas_clave) > 1:
+            # Cota redundante sobre la primera columna: SQLite no busca con una comparación de filas
+            # en un índice de expresiones, pero sí con ella
+            filtro = f"{columnas_clave[0]} {comparacion}= ? AND {filtro}"
+        ultima_clave = tuple(desde) if desde is not None else None
         
-        cursor.execute(query)
-        resultados = cursor.fetchall()
-        conn.close()
+        while True:
+            # La conexión solo se presta mientras se lee cada página
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                if ultima_clave is None:
+                    cursor.execute(consulta.format(filtro="1 = 1"), (*parametros, tamano_pagina))
+                else:
+                    valores = ultima_clave[:1] + ultima_clave if len(columnas_clave) > 1 else ultima_clave
+                    cursor.execute(consulta.format(filtro=filtro), (*parametros, *valores, tamano_pagina))
+                pagina = cursor.fetchmany(tamano_pagina)
+            
+            if not pagina:
+                return
+            yield pagina
+            if len(pagina) < tamano_pagina:
+                return
+            ultima_clave = tuple("" if pagina[-1][i] is None else pagina[-1][i] for i in posiciones_clave)
+    
+    def iterar_peliculas_horarios(self, tamano_pagina=20):
+        """Recorrer la cartelera por páginas ordenadas por fecha, hora e ID de horario"""
+        # Si la foto compartida está al día se pagina desde memoria; si no, se lee por páginas
+        # sin reconstruirla, para que la memoria no crezca con la tabla de horarios
+        anterior, resultados = self._cartelera
+        if anterior == self._version_cartelera():
+            for inicio in range(0, len(resultados), tamano_pagina):
+                yield resultados[inicio:inicio + tamano_pagina]
+            return
+        
+        yield from self._paginar("""
+            SELECT H.idHorario, P.titulo, H.fecha, H.hora, S.nombreSala, P.precioEntrada
+            FROM Horario H
+            JOIN Pelicula P ON P.idPelicula = H.idPelicula
+            JOIN Sala S ON H.idSala = S.idSala
+            WHERE {filtro}
+            ORDER BY COALESCE(H.fecha, ''), COALESCE(H.hora, ''), H.idHorario
+            LIMIT ?
+        """, ("COALESCE(H.fecha, '')", "COALESCE(H.hora, '')", "H.idHorario"), (2, 3, 0), tamano_pagina)
+    
+    def _consultar_peliculas_horarios(self):
+        """Consultar la cartelera completa en la base de datos"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT H.idHorario, P.titulo, H.fecha, H.hora, S.nombreSala, P.precioEntrada
+            FROM Pelicula P
+            JOIN Horario H ON P.idPelicula = H.idPelicula
+            JOIN Sala S ON H.idSala = S.idSala
+            ORDER BY COALESCE(H.fecha, ''), COALESCE(H.hora, ''), H.idHorario
+            """
+            
+            cursor.execute(query)
+            resultados = cursor.fetchall()
         
         return resultados
     
-    def ver_asientos_disponibles(self, id_horario):
+    def ver_asientos_disponibles(self, id_horario, sesion=None):
         """Ver asientos disponibles para un horario específico"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT 
-            A.idAsiento,
-            A.codigo AS Asiento,
-            S.nombreSala
-        FROM Asiento A
-        JOIN Sala S ON A.idSala = S.idSala
-        WHERE A.idAsiento NOT IN (
-            SELECT E.idAsiento
-            FROM Entrada E
-            WHERE E.idHorario = ?
-        )
-        AND A.idSala = (
-            SELECT H.idSala
-            FROM Horario H
-            WHERE H.idHorario = ?
+        retenidos = self.reservas.retenidos_por_otros(id_horario, sesion)
+        return [a for a in self.disponibilidad.asientos_libres(id_horario) if a[0] not in retenidos]
+    
+    def reservar_asientos(self, sesion, id_horario, id_asientos, ttl=None):
+        """Reservar temporalmente asientos libres para una sesión de compra"""
+        libres = {a[0] for a in self.disponibilidad.asientos_libres(id_horario)}
+        no_libres = [id_asiento for id_asiento in id_asientos if id_asiento not in libres]
+        reservados, rechazados = self.reservas.reservar(
+            sesion, id_horario, [id_asiento for id_asiento in id_asientos if id_asiento in libres], ttl
         )
-        ORDER BY A.codigo
-        """
-        
-        cursor.execute(query, (id_horario, id_horario))
-        resultados = cursor.fetchall()
-        conn.close()
-        
-        return resultados
+        return reservados, no_libres + rechazados
+    
+    def liberar_reservas(self, sesion, id_horario=None, id_asientos=None):
+        """Liberar las reservas de una sesión"""
+        return self.reservas.liberar(sesion, id_horario, id_asientos)
     
     def obtener_info_horario(self, id_horario):
         """Obtener información de un horario específico"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT P.titulo, H.fecha, H.hora, S.nombreSala
-        FROM Horario H
-        JOIN Pelicula P ON H.idPelicula = P.idPelicula
-        JOIN Sala S ON H.idSala = S.idSala
-        WHERE H.idHorario = ?
-        """
-        
-        cursor.execute(query, (id_horario,))
-        resultado = cursor.fetchone()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT P.titulo, H.fecha, H.hora, S.nombreSala
+            FROM Horario H
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            JOIN Sala S ON H.idSala = S.idSala
+            WHERE H.idHorario = ?
+            """
+            
+            cursor.execute(query, (id_horario,))
+            resultado = cursor.fetchone()
         
         return resultado
     
-    def comprar_entrada(self, id_horario, id_usuario, id_asiento, precio=8.50):
-        """Comprar una entrada"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar que el asiento esté disponible
+    def obtener_contexto_funcion(self, id_horario):
+        """Obtener título, fecha, hora, sala, película y precio de una función con una sola consulta"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             cursor.execute("""
-                SELECT COUNT(*) FROM Entrada 
-                WHERE idHorario = ? AND idAsiento = ?
-            """, (id_horario, id_asiento))
-            
-            if cursor.fetchone()[0] > 0:
-                conn.close()
-                return None, "El asiento ya está ocupado"
+                SELECT P.titulo, H.fecha, H.hora, S.nombreSala, P.idPelicula, P.precioEntrada,
+                       H.idHorario, H.idSala
+                FROM Horario H
+                JOIN Pelicula P ON H.idPelicula = P.idPelicula
+                JOIN Sala S ON H.idSala = S.idSala
+                WHERE H.idHorario = ?
+            """, (id_horario,))
+            fila = cursor.fetchone()
+        
+        return ShowtimeContext(*fila) if fila else None
+    
+    def comprar_entrada(self, id_horario, id_usuario, id_asiento, precio=8.50, sesion=None):
+        """Comprar una entrada"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            # Insertar entrada
-            cursor.execute("""
-                INSERT INTO Entrada (idHorario, idUsuario, idAsiento, precio)
-                VALUES (?, ?, ?, ?)
-            """, (id_horario, id_usuario, id_asiento, precio))
+            try:
+                # Las ventas no se deshacen: si el mapa lo marca ocupado no hace falta consultar
+                ocupado = self.disponibilidad.esta_ocupado(id_horario, id_asiento)
+                if ocupado is None:
+                    return None, "El asiento no pertenece a la sala de la función"
+                if ocupado:
+                    return None, "El asiento ya está ocupado"
+                
+                if id_asiento in self.reservas.retenidos_por_otros(id_horario, sesion):
+                    return None, "El asiento está reservado por otro cliente"
+                
+                # Verificar en la base de datos, que puede tener ventas de otros terminales
+                cursor.execute("""
+                    SELECT COUNT(*) FROM Entrada 
+                    WHERE idHorario = ? AND idAsiento = ?
+                """, (id_horario, id_asiento))
+                
+                if cursor.fetchone()[0] > 0:
+                    self.disponibilidad.marcar_ocupado(id_horario, id_asiento)
+                    return None, "El asiento ya está ocupado"
+                
+                # Insertar entrada
+                cursor.execute("""
+                    INSERT INTO Entrada (idHorario, idUsuario, idAsiento, precio)
+                    VALUES (?, ?, ?, ?)
+                """, (id_horario, id_usuario, id_asiento, precio))
+                
+                id_entrada = cursor.lastrowid
+                conn.commit()
+                self.disponibilidad.marcar_ocupado(id_horario, id_asiento)
+                if sesion is not None:
+                    self.reservas.liberar(sesion, id_horario, [id_asiento])
+                
+                return id_entrada, "Entrada comprada exitosamente"
             
-            id_entrada = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            except sqlite3.Error as e:
+                conn.rollback()
+                return None, f"Error al comprar entrada: {e}"
+    
+    def comprar_entradas(self, id_horario, id_usuario, id_asientos, precio=8.50, sesion=None):
+        """Comprar varias entradas de una función en una sola transacción (todas o ninguna)"""
+        id_asientos = list(id_asientos)
+        resultados = [{'asiento': id_asiento, 'id_entrada': None, 'mensaje': None} for id_asiento in id_asientos]
+        
+        if not id_asientos:
+            return resultados, "No se seleccionaron asientos"
+        
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            return id_entrada, "Entrada comprada exitosamente"
+            try:
+                # Bloqueo de escritura desde el inicio para que nadie venda entre la validación y el INSERT
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                # Validar todos los asientos con una sola consulta
+                marcadores = ", ".join("?" for _ in id_asientos)
+                cursor.execute(f"""
+                    SELECT A.idAsiento, E.idEntrada IS NOT NULL
+                    FROM Horario H
+                    JOIN Asiento A ON A.idSala = H.idSala
+                    LEFT JOIN Entrada E ON E.idHorario = H.idHorario AND E.idAsiento = A.idAsiento
+                    WHERE H.idHorario = ? AND A.idAsiento IN ({marcadores})
+                """, (id_horario, *id_asientos))
+                estado = dict(cursor.fetchall())
+                retenidos = self.reservas.retenidos_por_otros(id_horario, sesion)
+                
+                vistos = set()
+                for resultado in resultados:
+                    id_asiento = resultado['asiento']
+                    if id_asiento in vistos:
+                        resultado['mensaje'] = "Asiento repetido en la compra"
+                    elif id_asiento not in estado:
+                        resultado['mensaje'] = "El asiento no pertenece a la sala de la función"
+                    elif estado[id_asiento]:
+                        resultado['mensaje'] = "El asiento ya está ocupado"
+                        self.disponibilidad.marcar_ocupado(id_horario, id_asiento)
+                    elif id_asiento in retenidos:
+                        resultado['mensaje'] = "El asiento está reservado por otro cliente"
+                    vistos.add(id_asiento)
+                
+                rechazados = [r for r in resultados if r['mensaje']]
+                if rechazados:
+                    conn.rollback()
+                    for resultado in resultados:
+                        resultado['mensaje'] = resultado['mensaje'] or "No se compró: la compra es de todo o nada"
+                    return resultados, f"No se pudo completar la compra: {len(rechazados)} asiento(s) no disponibles"
+                
+                # Insertar todas las entradas
+                cursor.executemany("""
+                    INSERT INTO Entrada (idHorario, idUsuario, idAsiento, precio)
+                    VALUES (?, ?, ?, ?)
+                """, [(id_horario, id_usuario, id_asiento, precio) for id_asiento in id_asientos])
+                
+                cursor.execute(f"""
+                    SELECT idAsiento, idEntrada FROM Entrada
+                    WHERE idHorario = ? AND idAsiento IN ({marcadores})
+                """, (id_horario, *id_asientos))
+                id_entradas = dict(cursor.fetchall())
+                conn.commit()
+                
+                for resultado in resultados:
+                    resultado['id_entrada'] = id_entradas[resultado['asiento']]
+                    resultado['mensaje'] = "Entrada comprada exitosamente"
+                    self.disponibilidad.marcar_ocupado(id_horario, resultado['asiento'])
+                
+                # Las reservas de la sesión quedan convertidas en entradas
+                if sesion is not None:
+                    self.reservas.liberar(sesion, id_horario, id_asientos)
+                
+                return resultados, f"{len(resultados)} entrada(s) compradas exitosamente"
             
-        except sqlite3.Error as e:
-            conn.rollback()
-            conn.close()
-            return None, f"Error al comprar entrada: {e}"
+            except sqlite3.Error as e:
+                conn.rollback()
+                for resultado in resultados:
+                    resultado['id_entrada'] = None
+                    resultado['mensaje'] = f"Error al comprar entrada: {e}"
+                return resultados, f"Error al comprar entradas: {e}"
     
     def crear_boleta(self, id_entrada, id_metodo_pago, total):
         """Crear boleta para una entrada"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                INSERT INTO Boleta (idEntrada, idMetodoPago, fechaCompra, total)
-                VALUES (?, ?, ?, ?)
-            """, (id_entrada, id_metodo_pago, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), total))
-            
-            id_boleta = cursor.lastrowid
-            conn.commit()
-            conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            return id_boleta, "Boleta creada exitosamente"
+            try:
+                cursor.execute("""
+                    INSERT INTO Boleta (idEntrada, idMetodoPago, fechaCompra, total)
+                    VALUES (?, ?, ?, ?)
+                """, (id_entrada, id_metodo_pago, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), total))
+                
+                id_boleta = cursor.lastrowid
+                conn.commit()
+                
+                return id_boleta, "Boleta creada exitosamente"
             
-        except sqlite3.Error as e:
-            conn.rollback()
-            conn.close()
-            return None, f"Error al crear boleta: {e}"
+            except sqlite3.Error as e:
+                conn.rollback()
+                return None, f"Error al crear boleta: {e}"
     
-    def ver_boleta_completa(self, id_boleta):
+    def obtener_boleta(self, id_boleta):
+        """Obtener una boleta con su encabezado y sus entradas (desde la caché de boletas)"""
+        return self.cache_boletas.obtener(("boleta", id_boleta), lambda: self._consultar_boleta(id_boleta))
+    
+    def _consultar_boleta(self, id_boleta):
+        """Leer encabezado y líneas de una boleta con una sola consulta"""
         try:
-            conn = self.db_manager.conectar()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT B.idBoleta, u.nombreUsuario, M.descripcion, B.fechaCompra, B.total
-                FROM Boleta B
-                JOIN Usuario u ON u.idUsuario = (
-                    SELECT E.idUsuario FROM Entrada E
-                    JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
-                    WHERE BE.idBoleta = B.idBoleta LIMIT 1
-                )
-                JOIN MetodoPago M ON B.idMetodoPago = M.idMetodoPago
-                WHERE B.idBoleta = ?
-            """, (id_boleta,))
-            row = cursor.fetchone()
-            if row:
-                return {
-                    'id': row[0],
-                    'cliente': row[1],
-                    'metodo_pago': row[2],
-                    'fecha_compra': row[3],
-                    'total': row[4]
-                }
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                # El título va en una subconsulta por clave primaria: unido con LEFT JOIN, el
+                # planificador recorre la tabla Pelicula cuando es pequeña. Ordenar por la
+                # clave de BoletaEntrada reutiliza su índice y evita el árbol temporal del ORDER BY
+                cursor.execute("""
+                    SELECT B.idBoleta, B.idUsuario, U.nombreUsuario, M.descripcion, B.fechaCompra, B.total,
+                           (SELECT P.titulo FROM Pelicula P WHERE P.idPelicula = H.idPelicula),
+                           H.fecha, H.hora, S.nombreSala, A.codigo, E.precio
+                    FROM Boleta B
+                    LEFT JOIN Usuario U ON U.idUsuario = B.idUsuario
+                    LEFT JOIN MetodoPago M ON M.idMetodoPago = B.idMetodoPago
+                    LEFT JOIN BoletaEntrada BE ON BE.idBoleta = B.idBoleta
+                    LEFT JOIN Entrada E ON E.idEntrada = BE.idEntrada
+                    LEFT JOIN Horario H ON H.idHorario = E.idHorario
+                    LEFT JOIN Sala S ON S.idSala = H.idSala
+                    LEFT JOIN Asiento A ON A.idAsiento = E.idAsiento
+                    WHERE B.idBoleta = ?
+                    ORDER BY BE.idEntrada
+                """, (id_boleta,))
+                filas = cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error al obtener la boleta: {e}")
             return None
-        except Exception as e:
-            print(f"Error: {e}")
+        
+        if not filas:
+            return None
+        
+        # Las seis primeras columnas son el encabezado y las seis últimas, la línea de la entrada
+        boleta = dict(zip(CAMPOS_BOLETA, filas[0]))
+        boleta['entradas'] = [dict(zip(CAMPOS_ENTRADA_BOLETA, fila[6:])) for fila in filas if fila[6] is not None]
+        return boleta
+    
+    def ver_boleta_completa(self, id_boleta):
+        """Obtener el encabezado de una boleta"""
+        boleta = self.obtener_boleta(id_boleta)
+        if not boleta:
             return None
+        return {campo: valor for campo, valor in boleta.items() if campo != 'entradas'}
     
     def obtener_usuarios(self):
         """Obtener lista de usuarios"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT idUsuario, nombreUsuario, tipoUsuario FROM Usuario")
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT idUsuario, nombreUsuario, tipoUsuario FROM Usuario")
+            resultados = cursor.fetchall()
         
         return resultados
     
+    def invalidar_cache(self, *grupos):
+        """Invalidar datos de referencia modificados fuera de estos servicios (todos si no se indica)"""
+        if grupos:
+            self.cache.invalidar(*grupos)
+        else:
+            self.cache.limpiar()
+            self._cartelera_modificada()
+    
     def obtener_metodos_pago(self):
+        """Obtener métodos de pago disponibles (desde la caché de referencia)"""
+        return self.cache.obtener(("metodos_pago",), self._consultar_metodos_pago)
+    
+    def _consultar_metodos_pago(self):
         """Obtener métodos de pago disponibles"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT idMetodoPago, descripcion FROM MetodoPago")
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT idMetodoPago, descripcion FROM MetodoPago")
+            resultados = cursor.fetchall()
         
         return resultados
     
     def verificar_usuario(self, nombre_usuario, clave):
         """Verificar credenciales de usuario"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT idUsuario, tipoUsuario 
-            FROM Usuario 
-            WHERE nombreUsuario = ? AND clave = ?
-        """, (nombre_usuario, clave))
-        
-        resultado = cursor.fetchone()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT idUsuario, tipoUsuario 
+                FROM Usuario 
+                WHERE nombreUsuario = ? AND clave = ?
+            """, (nombre_usuario, clave))
+            
+            resultado = cursor.fetchone()
         
         return resultado
     
+    def iniciar_sesion(self, nombre_usuario, clave):
+        """Verificar credenciales una sola vez y abrir una sesión con token (None si no coinciden)"""
+        usuario = self.verificar_usuario(nombre_usuario, clave)
+        if not usuario:
+            return None
+        return self.sesiones.crear(usuario[0], nombre_usuario, usuario[1])
+    
+    def autorizar(self, token, tipo_usuario=None):
+        """Obtener la sesión vigente de un token sin consultar la base de datos, opcionalmente exigiendo un tipo de usuario"""
+        sesion = self.sesiones.obtener(token)
+        if sesion is None or (tipo_usuario is not None and sesion.tipo_usuario != tipo_usuario):
+            return None
+        return sesion
+    
+    def cerrar_sesion(self, token):
+        """Invalidar el token de una sesión"""
+        return self.sesiones.cerrar(token)
+    
     # Nuevos métodos para el administrador
     
     def obtener_generos(self):
+        """Obtener lista de géneros (desde la caché de referencia)"""
+        return self.cache.obtener(("generos",), self._consultar_generos)
+    
+    def _consultar_generos(self):
         """Obtener lista de géneros"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT idGenero, nombreGenero FROM Genero")
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT idGenero, nombreGenero FROM Genero")
+            resultados = cursor.fetchall()
         
         return resultados
     
     def obtener_tipos_audiencia(self):
+        """Obtener tipos de audiencia (desde la caché de referencia)"""
+        return self.cache.obtener(("tipos_audiencia",), self._consultar_tipos_audiencia)
+    
+    def _consultar_tipos_audiencia(self):
         """Obtener tipos de audiencia"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT idAudiencia, descripcion FROM TipoAudiencia")
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT idAudiencia, descripcion FROM TipoAudiencia")
+            resultados = cursor.fetchall()
         
         return resultados
     
     def agregar_pelicula(self, titulo, duracion, precio, id_genero, id_audiencia):
         """Agregar una nueva película"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
+        if not duracion or duracion <= 0:
+            return False
         
-        try:
-            cursor.execute("""
-                INSERT INTO Pelicula (titulo, duracion, precioEntrada, idGenero, idAudiencia)
-                VALUES (?, ?, ?, ?, ?)
-            """, (titulo, duracion, precio,  id_genero, id_audiencia))
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            conn.commit()
-            conn.close()
-            return True
+            try:
+                cursor.execute("""
+                    INSERT INTO Pelicula (titulo, duracion, precioEntrada, idGenero, idAudiencia)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (titulo, duracion, precio,  id_genero, id_audiencia))
+                
+                conn.commit()
+                self.cache.invalidar("precio_pelicula")
+                self._cartelera_modificada()
+                return True
             
-        except sqlite3.Error:
-            conn.rollback()
-            conn.close()
-            return False
+            except sqlite3.Error:
+                conn.rollback()
+                return False
     
     def obtener_peliculas(self):
         """Obtener lista de películas con sus detalles"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT 
-            P.idPelicula,
-            P.titulo,
-            P.duracion,
-            P.precioEntrada,
-            G.nombreGenero,
-            TA.descripcion
-        FROM Pelicula P
-        JOIN Genero G ON P.idGenero = G.idGenero
-        JOIN TipoAudiencia TA ON P.idAudiencia = TA.idAudiencia
-        ORDER BY P.titulo
-        """
-        
-        cursor.execute(query)
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT 
+                P.idPelicula,
+                P.titulo,
+                P.duracion,
+                P.precioEntrada,
+                G.nombreGenero,
+                TA.descripcion
+            FROM Pelicula P
+            JOIN Genero G ON P.idGenero = G.idGenero
+            JOIN TipoAudiencia TA ON P.idAudiencia = TA.idAudiencia
+            ORDER BY P.titulo
+            """
+            
+            cursor.execute(query)
+            resultados = cursor.fetchall()
         
         return resultados
     
+    def iterar_peliculas(self, tamano_pagina=20):
+        """Recorrer las películas por páginas ordenadas por título"""
+        yield from self._paginar("""
+            SELECT
+                P.idPelicula,
+                P.titulo,
+                P.duracion,
+                P.precioEntrada,
+                G.nombreGenero,
+                TA.descripcion
+            FROM Pelicula P
+            JOIN Genero G ON P.idGenero = G.idGenero
+            JOIN TipoAudiencia TA ON P.idAudiencia = TA.idAudiencia
+            WHERE {filtro}
+            ORDER BY P.titulo, P.idPelicula
+            LIMIT ?
+        """, ("P.titulo", "P.idPelicula"), (1, 0), tamano_pagina)
+    
     def obtener_salas(self):
+        """Obtener lista de salas (desde la caché de referencia)"""
+        return self.cache.obtener(("salas",), self._consultar_salas)
+    
+    def _consultar_salas(self):
         """Obtener lista de salas"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT idSala, nombreSala, capacidad FROM Sala")
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT idSala, nombreSala, capacidad FROM Sala")
+            resultados = cursor.fetchall()
         
         return resultados
     
     def obtener_asientos_sala(self, id_sala):
         """Obtener asientos de una sala específica"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT idAsiento, codigo
-            FROM Asiento
-            WHERE idSala = ?
-            ORDER BY codigo
-        """, (id_sala,))
-        
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT idAsiento, codigo
+                FROM Asiento
+                WHERE idSala = ?
+                ORDER BY codigo
+            """, (id_sala,))
+            
+            resultados = cursor.fetchall()
         
         return resultados
     
-    def eliminar_asiento(self, id_asiento):
-        """Eliminar un asiento"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
+    def generar_distribucion_asientos(self, id_sala, filas, columnas, reemplazar=False):
+        """Crear en lote una grilla de filas x columnas de asientos (A1, A2, ..., B1, ...) y actualizar la capacidad"""
+        # Devuelve (asientos creados, mensaje); la cantidad es None si no se pudo generar
+        if filas <= 0 or columnas <= 0:
+            return None, "La cantidad de filas y columnas debe ser positiva"
         
-        try:
-            # Verificar si el asiento está en uso
-            cursor.execute("""
-                SELECT COUNT(*) FROM Entrada
-                WHERE idAsiento = ?
-            """, (id_asiento,))
+        codigos = [
+            f"{codigo_fila(fila)}{columna}"
+            for fila in range(filas) for columna in range(1, columnas + 1)
+        ]
+        
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            if cursor.fetchone()[0] > 0:
-                conn.close()
-                return False
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                cursor.execute("SELECT 1 FROM Sala WHERE idSala = ?", (id_sala,))
+                if not cursor.fetchone():
+                    conn.rollback()
+                    return None, "La sala no existe"
+                
+                cursor.execute("SELECT idAsiento, codigo FROM Asiento WHERE idSala = ?", (id_sala,))
+                existentes = dict(cursor.fetchall())
+                codigos_existentes = set(existentes.values())
+                
+                conservados = 0
+                if reemplazar:
+                    # Los asientos fuera de la grilla se eliminan, salvo los que ya tienen entradas vendidas
+                    sobrantes = codigos_existentes - set(codigos)
+                    cursor.execute("""
+                        SELECT DISTINCT A.idAsiento FROM Asiento A
+                        JOIN Entrada E ON E.idAsiento = A.idAsiento
+                        WHERE A.idSala = ?
+                    """, (id_sala,))
+                    vendidos = {fila[0] for fila in cursor}
+                    eliminar = [
+                        (id_asiento,) for id_asiento, codigo in existentes.items()
+                        if codigo in sobrantes and id_asiento not in vendidos
+                    ]
+                    conservados = len(sobrantes) - len(eliminar)
+                    cursor.executemany("DELETE FROM Asiento WHERE idAsiento = ?", eliminar)
+                
+                nuevos = [(id_sala, codigo) for codigo in codigos if codigo not in codigos_existentes]
+                cursor.executemany("INSERT INTO Asiento (idSala, codigo) VALUES (?, ?)", nuevos)
+                
+                # La capacidad de la sala es la cantidad real de asientos
+                cursor.execute("""
+                    UPDATE Sala SET capacidad = (SELECT COUNT(*) FROM Asiento WHERE idSala = ?)
+                    WHERE idSala = ?
+                """, (id_sala, id_sala))
+                conn.commit()
             
-            # Eliminar asiento
-            cursor.execute("DELETE FROM Asiento WHERE idAsiento = ?", (id_asiento,))
+            except sqlite3.Error as e:
+                conn.rollback()
+                return None, f"Error al generar asientos: {e}"
+        
+        self.disponibilidad.invalidar_sala(id_sala)
+        self.cache.invalidar("salas")
+        
+        mensaje = f"{len(nuevos)} asientos creados"
+        if conservados:
+            mensaje += f" ({conservados} asientos fuera de la grilla se conservaron por tener entradas vendidas)"
+        return len(nuevos), mensaje
+    
+    def eliminar_asiento(self, id_asiento):
+        """Eliminar un asiento"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            conn.commit()
-            conn.close()
-            return True
+            try:
+                # Verificar si el asiento está en uso
+                cursor.execute("""
+                    SELECT COUNT(*) FROM Entrada 
+                    WHERE idAsiento = ?
+                """, (id_asiento,))
+                
+                if cursor.fetchone()[0] > 0:
+                    return False
+                
+                # Eliminar asiento y descontarlo de la capacidad de su sala
+                cursor.execute("""
+                    UPDATE Sala SET capacidad = capacidad - 1
+                    WHERE idSala = (SELECT idSala FROM Asiento WHERE idAsiento = ?)
+                """, (id_asiento,))
+                cursor.execute("DELETE FROM Asiento WHERE idAsiento = ?", (id_asiento,))
+                
+                conn.commit()
+                self.disponibilidad.invalidar_asiento(id_asiento)
+                self.cache.invalidar("salas")
+                return True
             
-        except sqlite3.Error:
-            conn.rollback()
-            conn.close()
-            return False
+            except sqlite3.Error:
+                conn.rollback()
+                return False
     
     def agregar_horario(self, id_pelicula, id_sala, fecha, hora):
-        """Agregar un nuevo horario"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar si ya existe un horario en la misma sala y fecha/hora
-            cursor.execute("""
-                SELECT COUNT(*) FROM Horario
-                WHERE idSala = ? AND fecha = ? AND hora = ?
-            """, (id_sala, fecha, hora))
+        """Agregar un nuevo horario si la sala está libre durante toda la función"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            if cursor.fetchone()[0] > 0:
-                conn.close()
-                return False
+            try:
+                # Bloqueo de escritura para que nadie programe la sala entre la verificación y el INSERT
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                cursor.execute("SELECT duracion FROM Pelicula WHERE idPelicula = ?", (id_pelicula,))
+                fila = cursor.fetchone()
+                if not fila:
+                    conn.rollback()
+                    return False
+                duracion = fila[0]
+                
+                # Verificar que no se solape con otra función de la misma sala (incluida la limpieza),
+                # releyendo la sala dentro de la transacción por si otro proceso la programó
+                self.ocupacion.refrescar(cursor, id_sala, fecha)
+                if self.ocupacion.conflictos(id_sala, fecha, hora, duracion):
+                    conn.rollback()
+                    return False
+                
+                # Insertar horario
+                cursor.execute("""
+                    INSERT INTO Horario (idPelicula, idSala, fecha, hora)
+                    VALUES (?, ?, ?, ?)
+                """, (id_pelicula, id_sala, fecha, hora))
+                id_horario = cursor.lastrowid
+                
+                # El índice se actualiza antes del commit: la siguiente transacción ya lo ve al día
+                self.ocupacion.agregar(id_horario, id_sala, fecha, hora, duracion)
+                try:
+                    conn.commit()
+                except sqlite3.Error:
+                    self.ocupacion.quitar(id_horario)
+                    raise
+                self._cartelera_modificada()
+                return True
             
-            # Insertar horario
-            cursor.execute("""
-                INSERT INTO Horario (idPelicula, idSala, fecha, hora)
-                VALUES (?, ?, ?, ?)
-            """, (id_pelicula, id_sala, fecha, hora))
+            except ValueError:
+                # Fecha u hora con formato inválido
+                conn.rollback()
+                return False
+            except sqlite3.Error:
+                conn.rollback()
+                return False
+    
+    def _ultimo_id_horario(self, cursor):
+        """Mayor ID de horario asignado, incluidos los de horarios ya eliminados"""
+        cursor.execute("""
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'Horario'), 0),
+                COALESCE((SELECT MAX(idHorario) FROM Horario), 0)
+            )
+        """)
+        return cursor.fetchone()[0]
+    
+    def importar_horarios(self, filas):
+        """Importar horarios (idPelicula, idSala, fecha, hora) en lote; se insertan los válidos y se informa cada fila"""
+        resultados = []
+        candidatos = []
+        for numero, fila in enumerate(filas, start=1):
+            resultado = {'fila': numero, 'id_horario': None, 'mensaje': None}
+            resultados.append(resultado)
+            try:
+                id_pelicula, id_sala, fecha, hora = fila
+                candidatos.append((resultado, int(id_pelicula), int(id_sala), *normalizar_fecha_hora(fecha, hora)))
+            except (TypeError, ValueError):
+                resultado['mensaje'] = "Fila inválida: se esperaba idPelicula, idSala, fecha (YYYY-MM-DD) y hora (HH:MM)"
+        
+        if not candidatos:
+            return resultados, f"0 horarios importados, {len(resultados)} rechazados"
+        
+        validos = []
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            conn.commit()
-            conn.close()
-            return True
+            try:
+                # Bloqueo de escritura desde el inicio para que nadie programe entre la validación y el INSERT
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                cursor.execute("SELECT idPelicula, duracion FROM Pelicula")
+                duraciones = dict(cursor.fetchall())
+                cursor.execute("SELECT idSala FROM Sala")
+                salas = {fila[0] for fila in cursor}
+                
+                # Releer cada sala en el rango de fechas del archivo por si otro proceso la programó
+                rangos = {}
+                for _, _, id_sala, fecha, _ in candidatos:
+                    if id_sala in salas:
+                        desde, hasta = rangos.get(id_sala, (fecha, fecha))
+                        rangos[id_sala] = (min(desde, fecha), max(hasta, fecha))
+                for id_sala, (desde, hasta) in rangos.items():
+                    self.ocupacion.refrescar(cursor, id_sala, desde, hasta)
+                
+                # Los IDs se asignan por adelantado para registrar cada fila aceptada en el índice
+                # de ocupación; así también se detectan los solapamientos entre filas del archivo
+                id_horario = self._ultimo_id_horario(cursor)
+                for resultado, id_pelicula, id_sala, fecha, hora in candidatos:
+                    if id_pelicula not in duraciones:
+                        resultado['mensaje'] = "La película no existe"
+                        continue
+                    if id_sala not in salas:
+                        resultado['mensaje'] = "La sala no existe"
+                        continue
+                    conflictos = self.ocupacion.conflictos(id_sala, fecha, hora, duraciones[id_pelicula])
+                    if conflictos:
+                        resultado['mensaje'] = f"La sala está ocupada: se solapa con el horario {conflictos[0]}"
+                        continue
+                    id_horario += 1
+                    self.ocupacion.agregar(id_horario, id_sala, fecha, hora, duraciones[id_pelicula])
+                    validos.append((resultado, (id_horario, id_pelicula, id_sala, fecha, hora)))
+                
+                cursor.executemany("""
+                    INSERT INTO Horario (idHorario, idPelicula, idSala, fecha, hora)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [horario for _, horario in validos])
+                conn.commit()
             
-        except sqlite3.Error:
-            conn.rollback()
-            conn.close()
-            return False
+            except sqlite3.Error as e:
+                conn.rollback()
+                for _, horario in validos:
+                    self.ocupacion.quitar(horario[0])
+                for resultado in resultados:
+                    resultado['mensaje'] = resultado['mensaje'] or f"Error al importar horario: {e}"
+                return resultados, f"Error al importar horarios: {e}"
+        
+        for resultado, horario in validos:
+            resultado['id_horario'] = horario[0]
+            resultado['mensaje'] = "Horario importado"
+        if validos:
+            self._cartelera_modificada()
+        
+        return resultados, f"{len(validos)} horarios importados, {len(resultados) - len(validos)} rechazados"
+    
+    def generar_programacion(self, fecha_inicio, dias=7, apertura="10:00", cierre="23:00",
+                             id_peliculas=None, id_salas=None, paso=5):
+        """Programar automáticamente las salas durante varios días y guardarlo en una sola transacción"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT idPelicula, duracion FROM Pelicula ORDER BY idPelicula")
+            peliculas = [fila for fila in cursor.fetchall() if id_peliculas is None or fila[0] in id_peliculas]
+            cursor.execute("SELECT idSala FROM Sala ORDER BY idSala")
+            salas = [fila[0] for fila in cursor.fetchall() if id_salas is None or fila[0] in id_salas]
+            # Planificar sobre la ocupación actual de la base; la escritura vuelve a validarla
+            fecha_fin = (date.fromisoformat(fecha_inicio) + timedelta(days=max(dias - 1, 0))).isoformat()
+            for id_sala in salas:
+                self.ocupacion.refrescar(cursor, id_sala, fecha_inicio, fecha_fin)
+        
+        filas = planificar(
+            peliculas, salas, fecha_inicio, dias, apertura, cierre,
+            limpieza=self.ocupacion.limpieza, paso=paso, ocupado_hasta=self.ocupacion.ocupado_hasta
+        )
+        if not filas:
+            return [], "No hay funciones para programar"
+        
+        # La escritura vuelve a validar cada función dentro de la transacción
+        return self.importar_horarios(filas)
     
     def obtener_horarios(self):
         """Obtener todos los horarios con detalles"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT 
-            H.idHorario,
-            P.titulo,
-            S.nombreSala,
-            H.fecha,
-            H.hora
-        FROM Horario H
-        JOIN Pelicula P ON H.idPelicula = P.idPelicula
-        JOIN Sala S ON H.idSala = S.idSala
-        ORDER BY H.fecha, H.hora
-        """
-        
-        cursor.execute(query)
-        resultados = cursor.fetchall()
-        conn.close()
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            query = """
+            SELECT 
+                H.idHorario,
+                P.titulo,
+                S.nombreSala,
+                H.fecha,
+                H.hora
+            FROM Horario H
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            JOIN Sala S ON H.idSala = S.idSala
+            ORDER BY H.fecha, H.hora
+            """
+            
+            cursor.execute(query)
+            resultados = cursor.fetchall()
         
         return resultados
     
+    def iterar_horarios(self, tamano_pagina=20):
+        """Recorrer los horarios por páginas ordenadas por fecha, hora e ID de horario"""
+        yield from self._paginar("""
+            SELECT
+                H.idHorario,
+                P.titulo,
+                S.nombreSala,
+                H.fecha,
+                H.hora
+            FROM Horario H
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            JOIN Sala S ON H.idSala = S.idSala
+            WHERE {filtro}
+            ORDER BY COALESCE(H.fecha, ''), COALESCE(H.hora, ''), H.idHorario
+            LIMIT ?
+        """, ("COALESCE(H.fecha, '')", "COALESCE(H.hora, '')", "H.idHorario"), (3, 4, 0), tamano_pagina)
+    
     def eliminar_horario(self, id_horario):
         """Eliminar un horario"""
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        try:
-            # Verificar si hay entradas vendidas para este horario
-            cursor.execute("""
-                SELECT COUNT(*) FROM Entrada
-                WHERE idHorario = ?
-            """, (id_horario,))
-            
-            if cursor.fetchone()[0] > 0:
-                conn.close()
-                return False
-            
-            # Eliminar horario
-            cursor.execute("DELETE FROM Horario WHERE idHorario = ?", (id_horario,))
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
             
-            conn.commit()
-            conn.close()
-            return True
+            try:
+                # Verificar si hay entradas vendidas para este horario
+                cursor.execute("""
+                    SELECT COUNT(*) FROM Entrada 
+                    WHERE idHorario = ?
+                """, (id_horario,))
+                
+                if cursor.fetchone()[0] > 0:
+                    return False
+                
+                # Eliminar horario
+                cursor.execute("DELETE FROM Horario WHERE idHorario = ?", (id_horario,))
+                
+                conn.commit()
+                self.disponibilidad.invalidar_horario(id_horario)
+                self.ocupacion.quitar(id_horario)
+                self._cartelera_modificada()
+                return True
             
-        except sqlite3.Error:
-            conn.rollback()
-            conn.close()
-            return False
-        
+            except sqlite3.Error:
+                conn.rollback()
+                return False
+    
     def obtener_id_pelicula_por_horario(self, id_horario):
         """Obtener el ID de película desde un horario específico"""
         try:
-            conn = self.db_manager.conectar()
-            cursor = conn.cursor()
-            query = """
-            SELECT idPelicula 
-            FROM Horario 
-            WHERE idHorario = ?
-            """
-            cursor.execute(query, (id_horario,))
-            resultado = cursor.fetchone()
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                query = """
+                SELECT idPelicula 
+                FROM Horario 
+                WHERE idHorario = ?
+                """
+                cursor.execute(query, (id_horario,))
+                resultado = cursor.fetchone()
             
             if resultado:
                 return resultado[0]  # Retorna el idPelicula
             else:
                 return None
-                
+        
         except sqlite3.Error as e:
             print(f"Error al obtener ID de película por horario: {e}")
             return None
-        finally:
-            cursor.close()
-
+    
     def obtener_id_pelicula_por_titulo(self, titulo):
         """Obtener el ID de película por su título"""
         try:
-            conn = self.db_manager.conectar()
-            cursor = conn.cursor()
-            query = """
-            SELECT idPelicula 
-            FROM Pelicula 
-            WHERE titulo = ?
-            """
-            cursor.execute(query, (titulo,))
-            resultado = cursor.fetchone()
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                query = """
+                SELECT idPelicula 
+                FROM Pelicula 
+                WHERE titulo = ?
+                """
+                cursor.execute(query, (titulo,))
+                resultado = cursor.fetchone()
             
             if resultado:
                 return resultado[0]  # Retorna el idPelicula
             else:
                 return None
-                
+        
         except sqlite3.Error as e:
             print(f"Error al obtener ID de película por título: {e}")
             return None
-        finally:
-            cursor.close()
-
+    
     def obtener_precio_pelicula(self, id_pelicula):
+        """Obtener el precio de entrada de una película (desde la caché de referencia)"""
+        return self.cache.obtener(
+            ("precio_pelicula", id_pelicula), lambda: self._consultar_precio_pelicula(id_pelicula)
+        )
+    
+    def _consultar_precio_pelicula(self, id_pelicula):
         """Obtener el precio de entrada de una película específica"""
         try:
-            conn = self.db_manager.conectar()
-            cursor = conn.cursor()
-            query = """
-            SELECT precioEntrada 
-            FROM Pelicula 
-            WHERE idPelicula = ?
-            """
-            cursor.execute(query, (id_pelicula,))
-            resultado = cursor.fetchone()
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                query = """
+                SELECT precioEntrada 
+                FROM Pelicula 
+                WHERE idPelicula = ?
+                """
+                cursor.execute(query, (id_pelicula,))
+                resultado = cursor.fetchone()
             
             if resultado:
                 return resultado[0]  # Retorna el precio
             else:
                 return None
-                
+        
         except sqlite3.Error as e:
             print(f"Error al obtener precio de película: {e}")
             return None
-        finally:
-            cursor.close()
-
-    def obtener_asientos_compra(self, id_horario):
-        conn = self.db_manager.conectar()
-        cursor = conn.cursor()
-        
-        query = """
-        SELECT a.idAsiento, a.codigo, s.nombreSala
-        FROM Asiento a
-        JOIN Sala s ON a.idSala = s.idSala
-        WHERE a.idSala = (
-            SELECT idSala FROM Horario WHERE idHorario = ?
-        )
-        AND a.idAsiento NOT IN (
-            SELECT idAsiento FROM Entrada WHERE idHorario = ?
-        )
-        ORDER BY a.codigo
-        """
-        cursor.execute(query, (id_horario, id_horario))
-        resultados = cursor.fetchall()
-        conn.close()
     
-        return resultados  
-
+    def obtener_asientos_compra(self, id_horario, sesion=None):
+        return self.ver_asientos_disponibles(id_horario, sesion)
+    
+    def comprar_reservas(self, sesion, id_horario, id_usuario, precio=8.50):
+        """Convertir en entradas todos los asientos reservados por la sesión en una función"""
+        id_asientos = self.reservas.reservas_de(sesion, id_horario)
+        if not id_asientos:
+            return [], "La sesión no tiene asientos reservados (o la reserva venció)"
+        return self.comprar_entradas(id_horario, id_usuario, id_asientos, precio, sesion)
+    
+    def checkout(self, id_entradas, id_metodo_pago, id_usuario=None):
+        """Crear la boleta y asociarle todas las entradas en una sola transacción (solo entradas del usuario, si se indica)"""
+        id_entradas = list(dict.fromkeys(id_entradas))
+        if not id_entradas:
+            return None, "No hay entradas para la boleta"
+        
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                cursor.execute("SELECT 1 FROM MetodoPago WHERE idMetodoPago = ?", (id_metodo_pago,))
+                if not cursor.fetchone():
+                    conn.rollback()
+                    return None, "Método de pago no válido"
+                
+                # El total se calcula con los precios registrados, no con los del cliente
+                marcadores = ", ".join("?" for _ in id_entradas)
+                cursor.execute(f"""
+                    SELECT COUNT(*), COALESCE(SUM(E.precio), 0), COUNT(BE.idBoleta), SUM(E.idUsuario IS NOT ?)
+                    FROM Entrada E
+                    LEFT JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
+                    WHERE E.idEntrada IN ({marcadores})
+                """, (id_usuario, *id_entradas))
+                encontradas, total, ya_asociadas, ajenas = cursor.fetchone()
+                
+                if encontradas != len(id_entradas):
+                    conn.rollback()
+                    return None, "Alguna de las entradas no existe"
+                if ya_asociadas:
+                    conn.rollback()
+                    return None, "Alguna de las entradas ya pertenece a otra boleta"
+                if id_usuario is not None and ajenas:
+                    conn.rollback()
+                    return None, "Alguna de las entradas pertenece a otro usuario"
+                
+                cursor.execute("""
+                    INSERT INTO Boleta (idMetodoPago, total)
+                    VALUES (?, ?)
+                """, (id_metodo_pago, total))
+                id_boleta = cursor.lastrowid
+                
+                cursor.executemany("""
+                    INSERT INTO BoletaEntrada (idBoleta, idEntrada)
+                    VALUES (?, ?)
+                """, [(id_boleta, id_entrada) for id_entrada in id_entradas])
+                
+                conn.commit()
+                return id_boleta, "Boleta creada con éxito."
+            
+            except sqlite3.Error as e:
+                conn.rollback()
+                return None, f"Error al crear boleta: {e}"
+    
+    def iterar_boletas_usuario(self, id_usuario, tamano_pagina=10, antes=None):
+        """Recorrer las boletas de un usuario por páginas, de la más reciente a la más antigua (anteriores a `antes`)"""
+        yield from self._paginar("""
+            SELECT B.idBoleta, B.fechaCompra, M.descripcion, B.total,
+                   (SELECT COUNT(*) FROM BoletaEntrada BE WHERE BE.idBoleta = B.idBoleta)
+            FROM Boleta B
+            LEFT JOIN MetodoPago M ON B.idMetodoPago = M.idMetodoPago
+            WHERE B.idUsuario = ? AND {filtro}
+            ORDER BY B.idBoleta DESC
+            LIMIT ?
+        """, ("B.idBoleta",), (0,), tamano_pagina, parametros=(id_usuario,), descendente=True,
+            desde=None if antes is None else (antes,))
+    
     def crear_boleta_sin_entrada(self, id_metodo_pago, total):
         try:
-            conn = self.db_manager.conectar()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO Boleta (idMetodoPago, total)
-                VALUES (?, ?)
-            """, (id_metodo_pago, total))
-            conn.commit()
-            return cursor.lastrowid, "Boleta creada con éxito."
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO Boleta (idMetodoPago, total)
+                    VALUES (?, ?)
+                """, (id_metodo_pago, total))
+                conn.commit()
+                return cursor.lastrowid, "Boleta creada con éxito."
         except Exception as e:
-            return None, f"Error al crear boleta: {e}" 
-
+            return None, f"Error al crear boleta: {e}"
+    
     def insertar_boleta_entrada(self, id_boleta, id_entrada):
         try:
-            conn = self.db_manager.conectar()
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO BoletaEntrada (idBoleta, idEntrada)
-                VALUES (?, ?)
-            """, (id_boleta, id_entrada))
-            conn.commit()
+            with self.db_manager.conexion() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO BoletaEntrada (idBoleta, idEntrada)
+                    VALUES (?, ?)
+                """, (id_boleta, id_entrada))
+                conn.commit()
+            # La boleta cambió después de emitida: su versión armada ya no sirve
+            self.cache_boletas.invalidar("boleta")
         except Exception as e:
-            print(f"❌ Error al asociar entrada a boleta: {e}")   
+            print(f"❌ Error al asociar entrada a boleta: {e}")
+    
+    
+    def ver_entradas_de_boleta(self, id_boleta):
+        """Obtener las entradas de una boleta"""
+        boleta = self.obtener_boleta(id_boleta)
+        return list(boleta['entradas']) if boleta else []
 
+    def iterar_consulta(self, consulta, parametros=(), tamano_lote=1000):
+        """Recorrer fila a fila el resultado de una consulta leyéndolo en lotes con fetchmany"""
+        # La conexión queda tomada mientras dure el recorrido, así que no se comparte con otras llamadas
+        with self.db_manager.conexion(compartida=False) as conn:
+            cursor = conn.cursor()
+            cursor.execute(consulta, parametros)
+            while True:
+                lote = cursor.fetchmany(tamano_lote)
+                if not lote:
+                    return
+                yield from lote
 
-    def ver_entradas_de_boleta(self, id_boleta):
-        try:
-            conn = self.db_manager.conectar()
+    def iterar_libro_entradas(self, tamano_lote=1000):
+        """Recorrer el detalle de todas las entradas vendidas"""
+        yield from self.iterar_consulta("""
+            SELECT E.idEntrada, BE.idBoleta, H.fecha, H.hora, P.titulo, S.nombreSala,
+                   A.codigo, U.nombreUsuario, E.precio
+            FROM Entrada E
+            JOIN Horario H ON E.idHorario = H.idHorario
+            JOIN Pelicula P ON H.idPelicula = P.idPelicula
+            JOIN Sala S ON H.idSala = S.idSala
+            LEFT JOIN Asiento A ON E.idAsiento = A.idAsiento
+            LEFT JOIN Usuario U ON E.idUsuario = U.idUsuario
+            LEFT JOIN BoletaEntrada BE ON BE.idEntrada = E.idEntrada
+            ORDER BY E.idEntrada
+        """, tamano_lote=tamano_lote)
+
+    def iterar_boletas(self, tamano_lote=1000):
+        """Recorrer todas las boletas emitidas con su cantidad de entradas"""
+        yield from self.iterar_consulta("""
+            SELECT B.idBoleta, B.fechaCompra, M.descripcion, B.total,
+                   (SELECT COUNT(*) FROM BoletaEntrada BE WHERE BE.idBoleta = B.idBoleta)
+            FROM Boleta B
+            LEFT JOIN MetodoPago M ON B.idMetodoPago = M.idMetodoPago
+            ORDER BY B.idBoleta
+        """, tamano_lote=tamano_lote)
+
+    def obtener_estadistica(self, reporte):
+        """Leer un reporte de ventas desde las tablas resumen (proporcional a la cantidad de grupos)"""
+        consulta, _ = REPORTES_ESTADISTICAS[reporte]
+        with self.db_manager.conexion() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT P.titulo, H.fecha, H.hora, S.nombreSala, A.idAsiento
-                FROM BoletaEntrada BE
-                JOIN Entrada E ON BE.idEntrada = E.idEntrada
-                JOIN Horario H ON E.idHorario = H.idHorario
-                JOIN Pelicula P ON H.idPelicula = P.idPelicula
-                JOIN Sala S ON H.idSala = S.idSala
-                JOIN Asiento A ON E.idAsiento = A.idAsiento
-                WHERE BE.idBoleta = ?
-            """, (id_boleta,))
-            rows = cursor.fetchall()
-            return [
-                {
-                    'pelicula': r[0],
-                    'fecha': r[1],
-                    'hora': r[2],
-                    'sala': r[3],
-                    'asiento': r[4]
-                } for r in rows
-            ]
-        except Exception as e:
-            print(f"Error al obtener entradas: {e}")
-            return []          
+            cursor.execute(consulta)
+            resultados = cursor.fetchall()
+
+        return resultados
+
+    def _calcular_estadisticas(self, cursor):
+        """Calcular los cuatro reportes completos recorriendo las entradas una sola vez"""
+        acumulados = {reporte: {} for reporte in REPORTES_ESTADISTICAS}
+        cursor.execute(CONSULTA_ESTADISTICAS_UNA_PASADA)
+        for titulo, genero, hora, vistas, recaudacion in cursor:
+            if titulo is not None:
+                peliculas = acumulados["peliculas"]
+                peliculas[titulo] = peliculas.get(titulo, 0) + vistas
+                ingresos = acumulados["recaudacion"]
+                ingresos[titulo] = ingresos.get(titulo, 0) + recaudacion
+            if genero is not None:
+                generos = acumulados["generos"]
+                generos[genero] = generos.get(genero, 0) + vistas
+            if hora is not None:
+                horas = acumulados["horarios"]
+                horas[hora] = horas.get(hora, 0) + vistas
+
+        return {
+            reporte: sorted(valores.items(), key=lambda fila: fila[1], reverse=True)
+            for reporte, valores in acumulados.items()
+        }
+
+    def calcular_estadisticas(self):
+        """Obtener todos los reportes desde las entradas, sin depender de las tablas resumen"""
+        with self.db_manager.conexion() as conn:
+            return self._calcular_estadisticas(conn.cursor())
+
+    def reconstruir_estadisticas(self):
+        """Comparar las tablas resumen con un recálculo completo y reconstruirlas"""
+        with self.db_manager.conexion() as conn:
+            cursor = conn.cursor()
+
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+
+                diferencias = {}
+                completos = self._calcular_estadisticas(cursor)
+                for reporte, (consulta_resumen, _) in REPORTES_ESTADISTICAS.items():
+                    cursor.execute(consulta_resumen)
+                    resumen = set(cursor.fetchall())
+                    completo = set(completos[reporte])
+                    diferencias[reporte] = {
+                        'consistente': resumen == completo,
+                        'sobrantes': sorted(resumen - completo),
+                        'faltantes': sorted(completo - resumen)
+                    }
+
+                self.db_manager.recalcular_estadisticas(cursor)
+                conn.commit()
+                return diferencias
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"Error al reconstruir estadísticas: {e}")
+                return None
@@ -0,0 +1,377 @@
+"""
+API HTTP/JSON del Sistema de Cine
+=================================
+
+Expone la cartelera, la disponibilidad de asientos, la compra, el checkout y las
+boletas de CinemaServices para clientes web o de autoservicio.
+
+Uso: python servidor_api.py [--host 127.0.0.1] [--puerto 8080] [--hilos 16]
+"""
+
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+from database_manager import DatabaseManager
+from servicios_del_cine import CinemaServices
+
+MAX_CUERPO = 1024 * 1024
+
+
+class ApiError(Exception):
+    """Error de una solicitud, con el código HTTP que se devuelve al cliente"""
+    
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+
+
+def _entero(valor, nombre):
+    # int() aceptaría True o 1.7 como ID: solo se admiten enteros y textos o reales sin parte decimal
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str):
+        try:
+            return int(valor)
+        except ValueError:
+            pass
+    raise ApiError(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un número entero")
+
+
+def _texto(valor, nombre):
+    if not isinstance(valor, str) or not valor:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un texto no vacío")
+    return valor
+
+
+def _enteros(valores, nombre):
+    if not isinstance(valores, list) or not valores:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser una lista no vacía de enteros")
+    return [_entero(valor, nombre) for valor in valores]
+
+
+class CinemaAPI:
+    """Rutas de la API sobre CinemaServices, independientes del transporte HTTP"""
+    
+    # (método, ruta, operación, acceso): acceso es None (público), "sesion" o un tipo de usuario
+    RUTAS = [
+        ("POST", r"/sesiones", "_iniciar_sesion", None),
+        ("DELETE", r"/sesiones", "_cerrar_sesion", "sesion"),
+        ("GET", r"/cartelera", "_cartelera", None),
+        ("GET", r"/metodos-pago", "_metodos_pago", None),
+        ("GET", r"/horarios/(\d+)", "_horario", None),
+        ("GET", r"/horarios/(\d+)/asientos", "_asientos", None),
+        ("POST", r"/horarios/(\d+)/reservas", "_reservar", "sesion"),
+        ("DELETE", r"/horarios/(\d+)/reservas", "_liberar", "sesion"),
+        ("POST", r"/horarios/(\d+)/compras", "_comprar", "sesion"),
+        ("POST", r"/checkout", "_checkout", "sesion"),
+        ("GET", r"/boletas", "_boletas", "sesion"),
+        ("GET", r"/boletas/(\d+)", "_boleta", "sesion"),
+        ("GET", r"/estadisticas", "_estadisticas", "Administrador"),
+    ]
+    
+    def __init__(self, cinema_services):
+        self.servicios = cinema_services
+        self._rutas = [(metodo, re.compile(ruta + "$"), getattr(self, operacion), acceso)
+                       for metodo, ruta, operacion, acceso in self.RUTAS]
+        # Última cartelera serializada: mientras la foto de CinemaServices no cambie, se reutilizan los bytes
+        self._cartelera_json = (None, None)
+        self.metricas = None
+    
+    def atender(self, metodo, ruta, token=None, cuerpo=None, consulta=None):
+        """Resolver una solicitud; devuelve (estado, respuesta) donde la respuesta es serializable o bytes"""
+        permitidos = False
+        for metodo_ruta, patron, operacion, acceso in self._rutas:
+            coincidencia = patron.match(ruta)
+            if not coincidencia:
+                continue
+            if metodo_ruta != metodo:
+                permitidos = True
+                continue
+            
+            sesion = None
+            if acceso is not None:
+                sesion = self.servicios.autorizar(token) if token else None
+                if sesion is None:
+                    raise ApiError(HTTPStatus.UNAUTHORIZED, "Sesión inválida o vencida")
+                if acceso != "sesion" and sesion.tipo_usuario != acceso:
+                    raise ApiError(HTTPStatus.FORBIDDEN, f"Se requiere un usuario {acceso}")
+            elif token:
+                # En rutas públicas el token es opcional, pero si viene se respeta su sesión
+                sesion = self.servicios.autorizar(token)
+            
+            argumentos = [int(grupo) for grupo in coincidencia.groups()]
+            return operacion(sesion, *argumentos, cuerpo=cuerpo or {}, consulta=consulta or {})
+        
+        if permitidos:
+            raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, f"Método {metodo} no permitido en {ruta}")
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Ruta no encontrada: {ruta}")
+    
+    def _iniciar_sesion(self, sesion, cuerpo, consulta):
+        sesion = self.servicios.iniciar_sesion(_texto(cuerpo.get("usuario"), "usuario"),
+                                               _texto(cuerpo.get("clave"), "clave"))
+        if sesion is None:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "Usuario o contraseña incorrectos")
+        return HTTPStatus.CREATED, sesion._asdict()
+    
+    def _cerrar_sesion(self, sesion, cuerpo, consulta):
+        self.servicios.cerrar_sesion(sesion.token)
+        return HTTPStatus.OK, {"mensaje": "Sesión cerrada"}
+    
+    def _cartelera(self, sesion, cuerpo, consulta):
+        filas = self.servicios.ver_peliculas_horarios()
+        anteriores, cuerpo_json = self._cartelera_json
+        if filas is not anteriores:
+            cuerpo_json = json.dumps([
+                {"id_horario": id_horario, "titulo": titulo, "fecha": fecha, "hora": hora,
+                 "sala": sala, "precio": precio}
+                for id_horario, titulo, fecha, hora, sala, precio in filas
+            ], ensure_ascii=False).encode("utf-8")
+            self._cartelera_json = (filas, cuerpo_json)
+        return HTTPStatus.OK, cuerpo_json
+    
+    def _metodos_pago(self, sesion, cuerpo, consulta):
+        return HTTPStatus.OK, [{"id": id_metodo, "descripcion": descripcion}
+                               for id_metodo, descripcion in self.servicios.obtener_metodos_pago()]
+    
+    def _contexto(self, id_horario):
+        contexto = self.servicios.obtener_contexto_funcion(id_horario)
+        if contexto is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No existe el horario {id_horario}")
+        return contexto
+    
+    def _horario(self, sesion, id_horario, cuerpo, consulta):
+        return HTTPStatus.OK, self._contexto(id_horario)._asdict()
+    
+    def _asientos(self, sesion, id_horario, cuerpo, consulta):
+        self._contexto(id_horario)
+        libres = self.servicios.ver_asientos_disponibles(id_horario, sesion.token if sesion else None)
+        return HTTPStatus.OK, [{"id_asiento": id_asiento, "codigo": codigo} for id_asiento, codigo, _ in libres]
+    
+    def _reservar(self, sesion, id_horario, cuerpo, consulta):
+        self._contexto(id_horario)
+        asientos = _enteros(cuerpo.get("asientos"), "asientos")
+        reservados, rechazados = self.servicios.reservar_asientos(sesion.token, id_horario, asientos)
+        estado = HTTPStatus.OK if not rechazados else HTTPStatus.CONFLICT
+        return estado, {"reservados": reservados, "rechazados": rechazados}
+    
+    def _liberar(self, sesion, id_horario, cuerpo, consulta):
+        return HTTPStatus.OK, {"liberados": self.servicios.liberar_reservas(sesion.token, id_horario)}
+    
+    def _comprar(self, sesion, id_horario, cuerpo, consulta):
+        contexto = self._contexto(id_horario)
+        if cuerpo.get("asientos") is None:
+            # Sin asientos explícitos se compran los reservados por la sesión
+            resultados, mensaje = self.servicios.comprar_reservas(
+                sesion.token, id_horario, sesion.id_usuario, contexto.precio
+            )
+        else:
+            resultados, mensaje = self.servicios.comprar_entradas(
+                id_horario, sesion.id_usuario, _enteros(cuerpo["asientos"], "asientos"),
+                contexto.precio, sesion.token
+            )
+        comprado = bool(resultados) and all(r["id_entrada"] for r in resultados)
+        return (HTTPStatus.CREATED if comprado else HTTPStatus.CONFLICT), {"entradas": resultados, "mensaje": mensaje}
+    
+    def _checkout(self, sesion, cuerpo, consulta):
+        entradas = _enteros(cuerpo.get("entradas"), "entradas")
+        id_metodo_pago = _entero(cuerpo.get("metodo_pago"), "metodo_pago")
+        id_boleta, mensaje = self.servicios.checkout(entradas, id_metodo_pago, sesion.id_usuario)
+        if id_boleta is None:
+            raise ApiError(HTTPStatus.CONFLICT, mensaje)
+        return HTTPStatus.CREATED, {"boleta": self.servicios.obtener_boleta(id_boleta), "mensaje": mensaje}
+    
+    def _boletas(self, sesion, cuerpo, consulta):
+        tamano = min(max(_entero(consulta.get("tamano", 10), "tamano"), 1), 100)
+        antes = _entero(consulta["antes"], "antes") if "antes" in consulta else None
+        pagina = next(self.servicios.iterar_boletas_usuario(sesion.id_usuario, tamano, antes), [])
+        # Cursor de la página siguiente: se envía como ?antes=<siguiente>
+        siguiente = pagina[-1][0] if len(pagina) == tamano else None
+        return HTTPStatus.OK, {
+            "boletas": [
+                {"id": id_boleta, "fecha_compra": fecha, "metodo_pago": metodo, "total": total, "entradas": entradas}
+                for id_boleta, fecha, metodo, total, entradas in pagina
+            ],
+            "siguiente": siguiente
+        }
+    
+    def _boleta(self, sesion, id_boleta, cuerpo, consulta):
+        boleta = self.servicios.obtener_boleta(id_boleta)
+        # Una boleta ajena se informa como inexistente para no revelar qué IDs existen
+        if boleta is None or (boleta["id_usuario"] != sesion.id_usuario and sesion.tipo_usuario != "Administrador"):
+            raise ApiError(HTTPStatus.NOT_FOUND, f"No existe la boleta {id_boleta}")
+        return HTTPStatus.OK, boleta
+    
+    def _estadisticas(self, sesion, cuerpo, consulta):
+        return HTTPStatus.OK, {
+            "servidor": self.metricas.estadisticas() if self.metricas else None,
+            "sesiones": self.servicios.sesiones.estadisticas(),
+            "pool": self.servicios.db_manager.pool.estadisticas(),
+            "boletas": self.servicios.cache_boletas.estadisticas()
+        }
+
+
+class CinemaRequestHandler(BaseHTTPRequestHandler):
+    """Traducir solicitudes HTTP a CinemaAPI; HTTP/1.1 mantiene abierta la conexión entre solicitudes"""
+    
+    protocol_version = "HTTP/1.1"
+    server_version = "CineAPI/1.0"
+    # Encabezados y cuerpo salen en escrituras separadas: con Nagle, cada respuesta esperaría el ACK diferido
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        # Las conexiones inactivas se cierran para devolver el hilo al pool
+        self.timeout = self.server.timeout_conexion
+        super().setup()
+    
+    def do_GET(self):
+        self._despachar("GET")
+    
+    def do_POST(self):
+        self._despachar("POST")
+    
+    def do_DELETE(self):
+        self._despachar("DELETE")
+    
+    def _leer_cuerpo(self):
+        longitud = _entero(self.headers.get("Content-Length", 0), "Content-Length")
+        if longitud < 0:
+            self.close_connection = True
+            raise ApiError(HTTPStatus.BAD_REQUEST, "Content-Length inválido")
+        if longitud > MAX_CUERPO:
+            # El cuerpo queda sin leer en el socket: la conexión no puede reutilizarse
+            self.close_connection = True
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo de la solicitud demasiado grande")
+        if not longitud:
+            return {}
+        try:
+            cuerpo = json.loads(self.rfile.read(longitud))
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "El cuerpo no es JSON válido") from None
+        if not isinstance(cuerpo, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON")
+        return cuerpo
+    
+    def _despachar(self, metodo):
+        inicio = time.perf_counter()
+        partes = urlsplit(self.path)
+        autorizacion = self.headers.get("Authorization", "")
+        token = autorizacion[7:].strip() if autorizacion.startswith("Bearer ") else None
+        try:
+            cuerpo = self._leer_cuerpo()
+            consulta = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+            estado, respuesta = self.server.api.atender(metodo, partes.path.rstrip("/") or "/", token, cuerpo, consulta)
+        except ApiError as e:
+            estado, respuesta = e.estado, {"error": e.mensaje}
+        except Exception:
+            logging.exception(f"Error al atender {metodo} {self.path}")
+            estado, respuesta = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error interno del servidor"}
+        
+        if not isinstance(respuesta, bytes):
+            respuesta = json.dumps(respuesta, ensure_ascii=False).encode("utf-8")
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+        
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(respuesta)))
+        self.send_header("Server-Timing", f"app;dur={duracion_ms:.3f}")
+        self.send_header("X-Response-Time", f"{duracion_ms:.3f}ms")
+        self.end_headers()
+        self.wfile.write(respuesta)
+        self.server.registrar(estado, duracion_ms)
+    
+    def log_message(self, formato, *args):
+        logging.debug(f"{self.address_string()} {formato % args}")
+
+
+class CinemaHTTPServer(HTTPServer):
+    """Servidor HTTP que atiende cada conexión en un pool acotado de hilos"""
+    
+    daemon_threads = True
+    
+    def __init__(self, direccion, cinema_services, hilos=16, timeout_conexion=5.0):
+        super().__init__(direccion, CinemaRequestHandler)
+        self.api = CinemaAPI(cinema_services)
+        self.api.metricas = self
+        self.hilos = hilos
+        self.timeout_conexion = timeout_conexion
+        self._executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="api")
+        self._lock = threading.Lock()
+        
+        # Cada hilo necesita su propia conexión
+        cinema_services.db_manager.pool.ampliar(hilos)
+        
+        self.conexiones = 0
+        self.solicitudes = 0
+        self.por_estado = {}
+        self._duracion_total = 0.0
+        self._duracion_maxima = 0.0
+    
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.conexiones += 1
+        self._executor.submit(self._atender_conexion, request, client_address)
+    
+    def _atender_conexion(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def registrar(self, estado, duracion_ms):
+        """Contabilizar una solicitud atendida"""
+        with self._lock:
+            self.solicitudes += 1
+            self.por_estado[int(estado)] = self.por_estado.get(int(estado), 0) + 1
+            self._duracion_total += duracion_ms
+            self._duracion_maxima = max(self._duracion_maxima, duracion_ms)
+    
+    def estadisticas(self):
+        """Obtener conexiones, solicitudes por estado y tiempos de respuesta en milisegundos"""
+        with self._lock:
+            return {
+                'hilos': self.hilos,
+                'conexiones': self.conexiones,
+                'solicitudes': self.solicitudes,
+                'solicitudes_por_conexion': self.solicitudes / self.conexiones if self.conexiones else 0.0,
+                'por_estado': dict(self.por_estado),
+                'duracion_media_ms': self._duracion_total / self.solicitudes if self.solicitudes else 0.0,
+                'duracion_maxima_ms': self._duracion_maxima
+            }
+    
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP/JSON del Sistema de Cine")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--hilos", type=int, default=16)
+    opciones = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    servidor = CinemaHTTPServer((opciones.host, opciones.puerto), CinemaServices(DatabaseManager()), opciones.hilos)
+    print(f"🎬 API del cine escuchando en http://{opciones.host}:{servidor.server_port} ({opciones.hilos} hilos)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Servidor detenido")
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Usuario autenticado al que pertenece un token
+UserSession = namedtuple("UserSession", ["token", "id_usuario", "nombre_usuario", "tipo_usuario"])
+
+
+class SessionStore:
+    """Sesiones de usuario en memoria por token, con vencimiento por inactividad y desalojo LRU"""
+    
+    def __init__(self, ttl=1800, max_sesiones=10000, reloj=time.monotonic):
+        self.ttl = ttl
+        self.max_sesiones = max_sesiones
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        # token -> (sesión, instante de vencimiento), ordenado del uso más antiguo al más reciente.
+        # Con un TTL único, el orden de uso es también el orden de vencimiento
+        self._sesiones = OrderedDict()
+        
+        self.creadas = 0
+        self.cerradas = 0
+        self.expiradas = 0
+        self.desalojadas = 0
+        self.busquedas = 0
+        self.rechazos = 0
+        self._latencia_total = 0
+        self._latencia_maxima = 0
+    
+    def _expirar(self, ahora):
+        """Quitar las sesiones vencidas; solo se revisa el extremo menos usado"""
+        while self._sesiones:
+            token, (_, vence) = next(iter(self._sesiones.items()))
+            if vence > ahora:
+                return
+            del self._sesiones[token]
+            self.expiradas += 1
+    
+    def crear(self, id_usuario, nombre_usuario, tipo_usuario):
+        """Abrir una sesión para un usuario ya verificado y devolverla con su token"""
+        sesion = UserSession(secrets.token_urlsafe(32), id_usuario, nombre_usuario, tipo_usuario)
+        with self._lock:
+            ahora = self._reloj()
+            self._expirar(ahora)
+            self._sesiones[sesion.token] = (sesion, ahora + self.ttl)
+            self.creadas += 1
+            while len(self._sesiones) > self.max_sesiones:
+                self._sesiones.popitem(last=False)
+                self.desalojadas += 1
+        return sesion
+    
+    def obtener(self, token):
+        """Buscar la sesión de un token y renovar su vencimiento (None si no existe o venció)"""
+        inicio = time.perf_counter_ns()
+        with self._lock:
+            ahora = self._reloj()
+            entrada = self._sesiones.get(token)
+            if entrada is not None and entrada[1] <= ahora:
+                del self._sesiones[token]
+                self.expiradas += 1
+                entrada = None
+            if entrada is None:
+                self.rechazos += 1
+                sesion = None
+            else:
+                sesion = entrada[0]
+                self._sesiones[token] = (sesion, ahora + self.ttl)
+                self._sesiones.move_to_end(token)
+            self.busquedas += 1
+            latencia = time.perf_counter_ns() - inicio
+            self._latencia_total += latencia
+            self._latencia_maxima = max(self._latencia_maxima, latencia)
+        return sesion
+    
+    def cerrar(self, token):
+        """Terminar una sesión; devuelve si existía"""
+        with self._lock:
+            if self._sesiones.pop(token, None) is None:
+                return False
+            self.cerradas += 1
+            return True
+    
+    def estadisticas(self):
+        """Obtener sesiones activas, contadores y latencia de búsqueda en microsegundos"""
+        with self._lock:
+            self._expirar(self._reloj())
+            return {
+                'activas': len(self._sesiones),
+                'max_sesiones': self.max_sesiones,
+                'ttl': self.ttl,
+                'creadas': self.creadas,
+                'cerradas': self.cerradas,
+                'expiradas': self.expiradas,
+                'desalojadas': self.desalojadas,
+                'busquedas': self.busquedas,
+                'rechazos': self.rechazos,
+                'latencia_media_us': self._latencia_total / self.busquedas / 1000 if self.busquedas else 0.0,
+                'latencia_maxima_us': self._latencia_maxima / 1000
+            }
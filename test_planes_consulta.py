@@ -0,0 +1,32 @@
+"""Comprobaciones de planes de consulta y de sentencias por compra (se ejecutan con pytest)"""
+import pytest
+
+from benchmarks import contar_sentencias_compra, recorridos_consultas_frecuentes
+
+
+@pytest.fixture(scope="module")
+def recorridos():
+    return dict(recorridos_consultas_frecuentes())
+
+
+@pytest.mark.parametrize("operacion", [
+    "ver_asientos_disponibles",
+    "obtener_asientos_compra",
+    "obtener_contexto_funcion",
+    "comprar_entrada",
+    "agregar_horario",
+    "obtener_asientos_sala",
+    "eliminar_asiento",
+    "verificar_usuario",
+    "ver_entradas_de_boleta",
+    "iterar_boletas_usuario"
+])
+def test_consultas_frecuentes_usan_indices(recorridos, operacion):
+    assert recorridos[operacion] == []
+
+
+def test_compra_con_contexto_lee_la_funcion_una_vez():
+    conteos = contar_sentencias_compra()
+    _, sentencias_contexto, _, de_funcion = conteos["con contexto"]
+    assert de_funcion == 1
+    assert sentencias_contexto < conteos["por partes"][1]